@@ -12,6 +12,19 @@ class PlayerBase:
     def isHuman(self):
         pass
 
+    def close(self):
+        """
+        Shut down anything the player keeps between moves, such as worker
+        processes. Players can also be used in a with block to close them.
+        """
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
     def __str__(self):
         return "{}_player".format(self.index)
 
@@ -55,7 +68,7 @@ class RandomPlayer(PlayerBase):
         Get list of legal moves and return any random one.
         """
         #time.sleep(0.25)
-        return random.choice(game.get_all_legal_moves())
+        return game.random_legal_move()
 
     def isHuman(self):
         """
@@ -73,10 +86,11 @@ class RandomPlayer(PlayerBase):
 
 class MovesInOrder(PlayerBase):
     """
-    Plays all of the legal moves in the order they are returned.
+    Plays all of the legal moves in order: horizontal lines then vertical lines.
     """
     def chooseMove(self, game):
-        moves = game.get_all_legal_moves()
+        # Move tuples sort into the same order they are generated in.
+        moves = sorted(game.get_all_legal_moves())
         # Take a move from the middle of the list
         ind = int(len(moves)*0.5)
         return moves[ind]
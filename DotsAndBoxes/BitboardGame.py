@@ -0,0 +1,319 @@
+try:
+    from Game import Game
+    from Topology import get_topology
+except ModuleNotFoundError:
+    from DotsAndBoxes.Game import Game
+    from DotsAndBoxes.Topology import get_topology
+import random
+
+class BitboardGame:
+    """
+    Alternative game backend for the AI players. Rather than building a Line
+    object per edge and a Box object per cell, every drawn edge is one bit of a
+    single integer and box owners are kept in a bytearray. Completing a box is
+    then one mask test against the precomputed masks in BoardTopology.
+    Exposes the same methods as Game so the players can search with either.
+    """
+    __slots__ = ("width", "height", "maxPlayers", "currentPlayer", "topology",
+        "edges", "owners", "sides", "sideCounts", "scores", "movesMade",
+        "moveStack", "hash")
+
+    def __init__(self, width, height, maxPlayers=2, curPlayer=1):
+        """
+        Initialise an empty bitboard game with given width and height.
+        Args:
+            width: int
+            height: int
+            maxPlayers: int (2)
+            curPlayer: int (1)
+        """
+        self.width = width
+        self.height = height
+        self.maxPlayers = maxPlayers
+        self.currentPlayer = curPlayer
+        self.topology = get_topology(width, height)
+        # Bit e is set once edge e has been drawn.
+        self.edges = 0
+        # Owner of each box, by box index. 0 is unclaimed.
+        self.owners = bytearray(self.topology.noBoxes)
+        # Sides drawn of each box, by box index.
+        self.sides = bytearray(self.topology.noBoxes)
+        # Number of boxes with 0, 1, 2, 3 and 4 sides drawn.
+        self.sideCounts = [self.topology.noBoxes, 0, 0, 0, 0]
+        # Boxes owned by each player. 0 is unclaimed.
+        self.scores = [self.topology.noBoxes] + [0]*max(maxPlayers, 2)
+        self.movesMade = []
+        # (edge index, boxes claimed, player who moved) for each turn, for undo_move.
+        self.moveStack = []
+        # Zobrist hash, the same value Game gives for the same position.
+        self.hash = self.topology.zobristPlayers[curPlayer]
+
+    @classmethod
+    def from_game(cls, game):
+        """
+        Build a bitboard copy of an existing Game, including blocked lines.
+        A BitboardGame is just copied.
+        Args:
+            game(Game/BitboardGame): game to convert
+        Returns:
+            BitboardGame
+        """
+        if isinstance(game, BitboardGame):
+            return game.get_copy()
+        new = cls(game.width, game.height, game.maxPlayers, game.currentPlayer)
+        for e, move in enumerate(new.topology.moves):
+            if game.grid[move[0]][move[1]][move[2]]:
+                new.edges |= 1 << e
+                new.hash ^= new.topology.zobristEdges[e]
+        new.sideCounts = [0, 0, 0, 0, 0]
+        for b in range(new.topology.noBoxes):
+            i, j = new.topology.box_coords(b)
+            new.owners[b] = game.boxes[i][j].owner
+            new.sides[b] = bin(new.edges & new.topology.boxMasks[b]).count("1")
+            new.sideCounts[new.sides[b]] += 1
+        new.scores = [new.owners.count(player) for player in range(len(new.scores))]
+        new.movesMade = game.movesMade.copy()
+        return new
+
+    def get_copy(self):
+        """
+        Returns a copy of this game. The box owners, side counts, scores
+        and moves made are copied; the edge bitmask and hash are immutable
+        ints so are shared. Like Game, the copy starts with an empty move
+        stack, so it can't undo moves made before it was copied.
+        Returns:
+            BitboardGame
+        """
+        new = BitboardGame.__new__(BitboardGame)
+        new.width = self.width
+        new.height = self.height
+        new.maxPlayers = self.maxPlayers
+        new.currentPlayer = self.currentPlayer
+        new.topology = self.topology
+        new.edges = self.edges
+        new.owners = self.owners[:]
+        new.sides = self.sides[:]
+        new.sideCounts = self.sideCounts.copy()
+        new.scores = self.scores.copy()
+        new.movesMade = self.movesMade.copy()
+        new.moveStack = []
+        new.hash = self.hash
+        return new
+
+    def increment_player(self):
+        """
+        Increments the player counter. Wraps around on self.maxPlayers.
+        """
+        self.currentPlayer += 1
+        if self.currentPlayer > self.maxPlayers:
+            self.currentPlayer = 1
+
+    def edge_index(self, move):
+        """
+        Find the edge index for a move, or None if it isn't on the board.
+        Args:
+            move: 3-tuple(int)
+        Returns:
+            int or None
+        """
+        try:
+            return self.topology.index.get(move)
+        except TypeError:
+            # Unhashable input can never be a move.
+            return None
+
+    def take_turn(self, move):
+        """
+        Takes a turn for the current player by drawing the edge for move.
+        If a box is completed the player keeps the turn.
+        Args:
+            move: 3-tuple(int)
+        """
+        e = self.edge_index(move)
+        if e is None or self.edges >> e & 1:
+            print("Illegal move {}".format(move))
+            return
+        self.edges |= 1 << e
+        self.movesMade.append(move)
+        player = self.currentPlayer
+        captured = []
+        for b in self.topology.edgeBoxes[e]:
+            sides = self.sides[b] + 1
+            self.sides[b] = sides
+            self.sideCounts[sides-1] -= 1
+            self.sideCounts[sides] += 1
+            if sides == 4:
+                self.owners[b] = self.currentPlayer
+                captured.append(b)
+        self.scores[player] += len(captured)
+        self.scores[0] -= len(captured)
+        if not captured:
+            self.increment_player()
+        self.moveStack.append((e, captured, player))
+        self.hash ^= (self.topology.zobristEdges[e]
+            ^ self.topology.zobristPlayers[player]
+            ^ self.topology.zobristPlayers[self.currentPlayer])
+
+    def undo_move(self):
+        """
+        Takes back the last turn made with take_turn.
+        Returns:
+            3-tuple(int): the move that was undone, or None if there was nothing to undo.
+        """
+        if not self.moveStack:
+            print("No moves to undo")
+            return None
+        e, captured, player = self.moveStack.pop()
+        self.edges &= ~(1 << e)
+        for b in self.topology.edgeBoxes[e]:
+            sides = self.sides[b] - 1
+            self.sides[b] = sides
+            self.sideCounts[sides+1] -= 1
+            self.sideCounts[sides] += 1
+        for b in captured:
+            self.owners[b] = 0
+        self.scores[player] -= len(captured)
+        self.scores[0] += len(captured)
+        self.hash ^= (self.topology.zobristEdges[e]
+            ^ self.topology.zobristPlayers[self.currentPlayer]
+            ^ self.topology.zobristPlayers[player])
+        self.currentPlayer = player
+        return self.movesMade.pop()
+
+    def is_legal_move(self, move):
+        """
+        Checks if a certain move is legal.
+        Args:
+            move: 3-tuple(int)
+        Returns:
+            bool
+        """
+        e = self.edge_index(move)
+        return e is not None and not self.edges >> e & 1
+
+    def get_all_legal_moves(self, generate=False):
+        """
+        Finds all legal moves, horizontal lines then vertical lines.
+        Args:
+            generate(Bool): Unused, kept for compatibility with Game.
+        Returns:
+            List[3-tuple(int)]
+        """
+        edges = self.edges
+        return [move for e, move in enumerate(self.topology.moves) if not edges >> e & 1]
+
+    def iter_legal_moves(self):
+        """
+        Iterate over the legal moves without building a list.
+        Returns:
+            Iterator[3-tuple(int)]
+        """
+        edges = self.edges
+        return (move for e, move in enumerate(self.topology.moves) if not edges >> e & 1)
+
+    def random_legal_move(self, rng=random):
+        """
+        Pick a random legal move.
+        Args:
+            rng(random.Random): source of randomness
+        Returns:
+            3-tuple(int)
+        """
+        return rng.choice(self.get_all_legal_moves())
+
+    def is_finished(self):
+        """
+        Checks if every edge has been drawn.
+        Returns:
+            bool
+        """
+        return self.edges == self.topology.fullMask
+
+    def get_scores(self):
+        """
+        returns the scores for all players and the number of unclaimed boxes.
+        Returns:
+            dict{int:int}
+        """
+        return {player: score for player, score in enumerate(self.scores)}
+
+    def check_score(self, player):
+        """
+        Get and return the score for one player.
+        Args:
+            player: int
+        Returns:
+            int
+        """
+        if 0 <= player < len(self.scores):
+            return self.scores[player]
+        return 0
+
+    def get_side_counts(self):
+        """
+        Count how many boxes have 0, 1, 2, 3 and 4 sides drawn.
+        Returns:
+            List[int]
+        """
+        return self.sideCounts.copy()
+
+    def get_edge_mask(self):
+        """
+        Get the drawn lines as a bitmask, the same as Game.get_edge_mask.
+        Returns:
+            int
+        """
+        return self.edges
+
+    def get_box_sides_for_line(self, move):
+        """
+        Finds how many sides are drawn in each of the boxes next to a line.
+        Args:
+            move: 3-tuple(int)
+        Returns:
+            List[int]
+        """
+        return [self.sides[b] for b in self.topology.edgeBoxes[self.topology.index[move]]]
+
+    # Winner and results saving only depend on the methods above, so share
+    # the Game implementations.
+    winner = Game.winner
+    save_statistics = Game.save_statistics
+
+    def print_grid(self):
+        """
+        Prints an ascii representation of the board, in the same style as Game.
+        """
+        index = self.topology.index
+        for i in range(self.height):
+            row = ""
+            for j in range(self.width-1):
+                row += "*---" if self.edges >> index[(0, i, j)] & 1 else "*- -"
+            print(row + "*")
+            if i != self.height-1:
+                row = ""
+                for j in range(self.width):
+                    row += "|" if self.edges >> index[(1, j, i)] & 1 else "¦"
+                    if j != self.width-1:
+                        owner = self.owners[i*(self.width-1)+j]
+                        row += " {} ".format(owner if owner else " ")
+                print(row)
+
+    def __hash__(self):
+        """
+        Builtin hash method, using the incrementally updated Zobrist hash.
+        """
+        return self.hash
+
+    def __eq__(self, other):
+        """
+        Games are equal if they have the same dimensions, the same lines drawn,
+        the same box owners and it is the same player's turn.
+        """
+        if not isinstance(other, BitboardGame):
+            return NotImplemented
+        return (self.width == other.width
+            and self.height == other.height
+            and self.currentPlayer == other.currentPlayer
+            and self.edges == other.edges
+            and self.owners == other.owners)
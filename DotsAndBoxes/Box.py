@@ -4,19 +4,40 @@ except ModuleNotFoundError:
     from DotsAndBoxes.Line import Line
 
 class Box:
-    def __init__(self, top, bottom, left, right, owner=0):
+    __slots__ = ("completed", "owner", "edges", "sides")
+
+    def __init__(self, top, bottom, left, right, owner=0, sides=None):
         """
         Initialise a new box with its four edges and owner.
         Args:
             top, bottom, left, right: Line
+            owner: int
+            sides: int, number of edges already drawn. Counted from the edges if None.
         """
         self.completed = False
         self.owner = owner
-        self.edges = [top, bottom, left, right]
-        self.top = top
-        self.bottom = bottom
-        self.left = left
-        self.right = right
+        # Edges in the order (top, bottom, left, right)
+        self.edges = (top, bottom, left, right)
+        # Number of edges drawn, kept up to date by Game as lines are drawn and erased.
+        if sides is None:
+            sides = sum([bool(x) for x in self.edges])
+        self.sides = sides
+
+    @property
+    def top(self):
+        return self.edges[0]
+
+    @property
+    def bottom(self):
+        return self.edges[1]
+
+    @property
+    def left(self):
+        return self.edges[2]
+
+    @property
+    def right(self):
+        return self.edges[3]
 
     def sides_completed(self):
         """
@@ -24,7 +45,7 @@ class Box:
         Returns:
             int
         """
-        return sum([bool(x) for x in self.edges])
+        return self.sides
 
     def check_completed(self, player):
         """
@@ -37,13 +58,20 @@ class Box:
                 not if it was previously completed.
         """
         if not self.completed:
-            if all(self.edges):
+            if self.sides == 4:
                 #print("Player {} got a box!".format(player))
                 self.owner = player
                 self.completed = True
                 return True
         return False
 
+    def clear(self):
+        """
+        Un-claim the box. Used when the move that completed it is undone.
+        """
+        self.owner = 0
+        self.completed = False
+
     def __str__(self):
         """
         String representation for Box. If there is no owner, return " ". Otherwise,
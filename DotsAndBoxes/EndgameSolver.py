@@ -0,0 +1,142 @@
+## sources
+## Berlekamp, The Dots and Boxes Game: Sophisticated Child's Play (2000)
+## https://en.wikipedia.org/wiki/Dots_and_Boxes#Strategy
+
+from functools import lru_cache
+
+# Marker for the outside of the board in the box graph.
+GROUND = -1
+
+def is_loony(game):
+    """
+    Quick check for the simple loony endgame: every box still in play has
+    exactly two sides drawn. There is then nothing to capture and every move
+    gives boxes away, and the board splits into separate chains and loops.
+    Args:
+        game(Game): game state to check
+    Returns:
+        bool
+    """
+    counts = game.get_side_counts()
+    return counts[0] == 0 and counts[1] == 0 and counts[3] == 0 and counts[2] > 0
+
+def analyse(game):
+    """
+    Breaks a loony endgame position down into its chains and loops.
+    Each undrawn line joins the boxes either side of it, or a box and the
+    outside of the board. When every open box has two undrawn lines this graph
+    is a set of paths that start and end outside the board (chains) and
+    cycles (loops).
+    Args:
+        game(Game): game state to analyse
+    Returns:
+        2-tuple(List[int], List[int]): lengths of all chains and all loops, or
+            None if the position isn't a simple loony endgame.
+    """
+    topology = game.topology
+    neighbours = {}
+    for move in game.iter_legal_moves():
+        boxes = topology.edgeBoxes[topology.index[move]]
+        if len(boxes) == 2:
+            neighbours.setdefault(boxes[0], []).append(boxes[1])
+            neighbours.setdefault(boxes[1], []).append(boxes[0])
+        else:
+            neighbours.setdefault(boxes[0], []).append(GROUND)
+    if any(len(n) != 2 for n in neighbours.values()):
+        return None
+
+    chains = []
+    loops = []
+    visited = set()
+    # Chains first. Walk from a box at one end to the ground at the other.
+    for start, ends in neighbours.items():
+        if start in visited or GROUND not in ends:
+            continue
+        length = 0
+        previous, current = GROUND, start
+        while current != GROUND:
+            visited.add(current)
+            length += 1
+            a, b = neighbours[current]
+            previous, current = current, (b if a == previous else a)
+        chains.append(length)
+    # Anything left over is part of a loop. Walk round until we're back at the start.
+    for start in neighbours:
+        if start in visited:
+            continue
+        length = 0
+        previous, current = None, start
+        while True:
+            visited.add(current)
+            length += 1
+            a, b = neighbours[current]
+            previous, current = current, (b if a == previous else a)
+            if current == start:
+                break
+        loops.append(length)
+    return chains, loops
+
+@lru_cache(maxsize=100000)
+def _value(chains, loops):
+    """
+    Net boxes won by the player to move, who has to open one of the components.
+    Args:
+        chains(Tuple[int]): sorted chain lengths
+        loops(Tuple[int]): sorted loop lengths
+    Returns:
+        int
+    """
+    if not chains and not loops:
+        return 0
+    best = None
+    for k in set(chains):
+        rest = list(chains)
+        rest.remove(k)
+        r = _value(tuple(rest), loops)
+        if k <= 2:
+            # Short chains are opened so they can't be declined: a 2-chain is
+            # opened in the middle. The opponent takes everything and moves.
+            value = -(k + r)
+        else:
+            # The opponent either takes all k boxes and moves next, or takes
+            # k-2 and hands back the last 2 to keep control.
+            value = -max(k + r, k - 4 - r)
+        if best is None or value > best:
+            best = value
+    for k in set(loops):
+        rest = list(loops)
+        rest.remove(k)
+        r = _value(chains, tuple(rest))
+        # Keeping control of a loop costs 4 boxes rather than 2.
+        value = -max(k + r, k - 8 - r)
+        if best is None or value > best:
+            best = value
+    return best
+
+def solve(chains, loops):
+    """
+    Solve a loony endgame exactly.
+    Args:
+        chains(List[int]): chain lengths
+        loops(List[int]): loop lengths
+    Returns:
+        int: boxes the player to move will win minus boxes their opponent will
+            win from here, with both playing perfectly.
+    """
+    return _value(tuple(sorted(chains)), tuple(sorted(loops)))
+
+def solve_game(game):
+    """
+    Analyse and solve a game if it is in a simple loony endgame.
+    Args:
+        game(Game): game state to solve
+    Returns:
+        int: net boxes still to be won by the player to move, or None if
+            the position can't be solved this way.
+    """
+    if not is_loony(game):
+        return None
+    components = analyse(game)
+    if components is None:
+        return None
+    return solve(*components)
@@ -9,6 +9,8 @@ from Game import Game
 import ReadStatistics
 import GameGUI
 import PlayerFactory
+import Tournament
+import Sweep
 import math
 from MonteCarloPlayer import MonteCarloPlayer
 
@@ -191,91 +193,28 @@ def main(trials=100,height=3,width=3):
     ex = ExperimentFrame()
     sys.exit(app.exec_())
 
-def c_experiment(no_trials=100, timeLimit=5):
+def c_experiment(no_trials=100, timeLimit=5, minGames=None):
     """
     Runs an experiment with MonteCarloPlayer, altering the value for c each time.
+    The games are played by Sweep, so a run that stops part way carries on
+    where it left off when started again. Setting minGames drops the worst
+    values of c early by successive halving.
     """
-    experiment_filenames = []
     setName = "random-v-monty2-29-03"
-    filename_base = "Results\\"+setName+"\\1_random_2_monty_3x3_c-{}.txt"
-    playerFactory = PlayerFactory.PlayerFactory()
-    try:
-        os.mkdir("Results\\"+setName)
-    except FileExistsError:
-        pass
     # values from 1.0 to 5.0 in increments of 0.2
     c_values = [x/10 for x in range(10,51,2)]
     # also try root 2 just for kicks.
     c_values.append(math.sqrt(2))
-    for c in c_values:
-        # create results file
-        experiment_filename = filename_base.format(c)
-        experiment_filenames.append(experiment_filename)
-        f = open(experiment_filename,"w+")
-        f.close()
-        # create players
-        randomPlayer = playerFactory.makePlayer("Random Player", 1, "red")
-        print("\nStarting trail with c={}".format(c))
-        # run game no_trials amount of times
-        for i in range(no_trials):
-            game = Game(3,3)
-            monteCarloPlayer = playerFactory.makePlayer("Monte Carlo Player", 2, "red", timeLimit=timeLimit, c=c)
-            players = [randomPlayer, monteCarloPlayer]
-            while not game.is_finished():
-                player = players[game.currentPlayer-1]
-                move = player.chooseMove(game.get_copy())
-                game.take_turn(move)
-            game.save_statistics(experiment_filename, "a+")
-            print("\nCompleted trial {} with c={}.".format(i, c))
-            game.print_grid()
-            ReadStatistics.get_scores(experiment_filename)
+    sweep = Sweep.Sweep("Monte Carlo Player", {"c": c_values}, "Random Player", {"timeLimit": timeLimit}, games=no_trials, minGames=minGames, resultsDir=os.path.join("Results", setName))
+    sweep.run()
     print("\n\nAll trials completed.")
-    ReadStatistics.compare(experiment_filenames)
 
 def tournament():
-    playerFactory = PlayerFactory.PlayerFactory()
-    # get all player types except human
-    playerTypes = playerFactory.playerTypes.copy()[1:]
-    filenameBase = "Results\\rand-ord-19-05\\{}"
-    # set up experiment parameters
-    boardSizes = [(3, 3), (4, 4), (5, 5), (6, 6)]
-    noTrials = 10000
-    # go through all sizes
-    for size in boardSizes:
-        height, width = size[0], size[1]
-        gameLength = ((width-1)*height) + ((height-1)*width)
-        # go through all the player types for player 1 and player 2
-        for p1type in ["Random Player", "Ordered Player"]:
-            for p2type in ["Random Player", "Ordered Player"]:
-                if p1type == "Ordered Player" and p2type == "Ordered Player":
-                    break
-                # set up the results file
-                p1name = p1type.split()[0]
-                p2name = p2type.split()[0]
-                filenameExp = "1_{}_2_{}_{}x{}.txt".format(p1name, p2name, height, width)
-                experimentFilename = filenameBase.format(filenameExp)
-                f = open(experimentFilename,"w+")
-                f.close()
-                print("Starting trials: {} vs {}".format(p1type, p2type))
-                # start game trials
-                for i in range(noTrials):
-                    game = Game(height, width)
-                    player1 = playerFactory.makePlayer(p1type, 1, timeLimit=5)
-                    player2 = playerFactory.makePlayer(p2type, 2, timeLimit=5)
-                    players = [player1, player2]
-                    print("Starting Trial {}...".format(i+1))
-                    while not game.is_finished():
-                        player = players[game.currentPlayer-1]
-                        move = player.chooseMove(game.get_copy())
-                        game.take_turn(move)
-                        progressMade = int((len(game.movesMade)/gameLength)*100)
-                        progressLeft = 100 - progressMade
-                        progress = "\r"+("-"*progressMade)+("|"*progressLeft)
-                        print(progress, end="", flush=True)
-                    game.save_statistics(experimentFilename, "a+")
-                    print("\rCompleted Trial {}.".format(i+1)+" "*90, flush=True)
-                print("Completed trials: {} vs {}".format(p1type, p2type))
-    print("\n\nAll trials completed.")
+    """
+    Random and ordered players against each other on boards from 3x3 to 6x6.
+    The games are played headless in a process pool by Tournament.
+    """
+    Tournament.main(os.path.join("Results", "rand-ord-19-05"))
 
 
 if __name__ == '__main__':
@@ -1,11 +1,24 @@
 try:
     from Box import Box
     from Line import Line
+    from MoveSet import MoveSet
+    from Topology import get_topology
+    import GameRecord
 except ModuleNotFoundError:
     from DotsAndBoxes.Box import Box
     from DotsAndBoxes.Line import Line
+    from DotsAndBoxes.MoveSet import MoveSet
+    from DotsAndBoxes.Topology import get_topology
+    import DotsAndBoxes.GameRecord as GameRecord
+import random
 
 class Game:
+    __slots__ = ("width", "height", "currentPlayer", "maxPlayers", "legalMoves",
+        "movesMade", "topology", "moveStack", "grid", "boxes", "boxList", "scores",
+        "sideCounts", "hash")
+    # Name of the variant, for game records.
+    variant = "standard"
+
     def __init__(self, width, height, maxPlayers=2, curPlayer=1, legalMoves=False, copy_grid=None, copy_boxes=None, movesMade=None):
         """
         Initialise the game with given width and height.
@@ -15,7 +28,7 @@ class Game:
             height: int
             maxPlayers: int (2)
             curPlayer: int (1)
-            legalMoves: List(3-Tuple(int))
+            legalMoves: MoveSet or List(3-Tuple(int))
             copy_grid: List[][][Line]
             copy_boxes: List[][Box]
         """
@@ -23,30 +36,28 @@ class Game:
         self.height = height
         self.currentPlayer = curPlayer
         self.maxPlayers = maxPlayers
+        if legalMoves is not False and not isinstance(legalMoves, MoveSet):
+            legalMoves = MoveSet(legalMoves)
         self.legalMoves = legalMoves
         self.movesMade = movesMade
+        self.topology = get_topology(width, height)
+        # Record of every turn taken so it can be undone. Each entry is
+        # (move, boxes claimed, player who moved, hash).
+        # Copies start with an empty stack.
+        self.moveStack = []
         if copy_grid is None and copy_boxes is None:
             self.build_game()
         else:
             self.build_from_copy(copy_grid, copy_boxes)
+        self.count_boxes()
+        # Zobrist hash of the position, kept up to date by take_turn.
+        self.hash = self.compute_hash()
 
     def build_game(self):
         """
         Builds an empty game board with internal width and height.
         """
-        # Build two lists of horizontal and vertical lines.
-        self.grid = [
-            [[Line() for j in range(self.width-1)] for i in range(self.height)],
-            [[Line() for j in range(self.height-1)] for i in range(self.width)]
-        ]
-        # This means grid[0][0][0] is the top left horizontal line
-        # grid[1][0][0] is the top left vertical line
-        # Then build the box objects in a 2d list
-        self.boxes = [[0 for i in range(self.width-1)] for j in range(self.height-1)]
-        for i in range(self.height-1):
-            for j in range(self.width-1):
-                # Boxes are constructed with lines in the order [top, bottom, left, right]
-                self.boxes[i][j] = Box(self.grid[0][i][j], self.grid[0][i+1][j], self.grid[1][j][i], self.grid[1][j+1][i])
+        self.link_board([Line() for e in range(self.topology.noEdges)])
         # Build a list of all legal moves that can be made
         self.get_all_legal_moves()
         self.movesMade = []
@@ -58,35 +69,103 @@ class Game:
             copy_grid: List[][][Line]
             copy_boxes: List[][Box]
         """
-        # Build two lists of horizontal and vertical lines using the input grid.
+        # One new line per edge, in topology order, with the same owners.
+        lines = [Line(copy_grid[o][i][j].owner) for o, i, j in self.topology.moves]
+        self.link_board(lines, [box for row in copy_boxes for box in row])
+
+    def link_board(self, lines, copy_boxes=None):
+        """
+        Builds the grid and boxes from a flat list of lines in topology order.
+        Which lines belong to which box comes from the shared topology, so
+        nothing has to be worked out again for each game.
+        Args:
+            lines: List[Line]
+            copy_boxes: List[Box], boxes to copy owners and sides from in box
+                index order, or None for an empty board.
+        """
+        width, height = self.width, self.height
+        # Horizontal lines come first, a row of width-1 for each row of dots.
+        vertical = height*(width-1)
         self.grid = [
-            [[Line(j.owner) for j in i] for i in copy_grid[0]],
-            [[Line(j.owner) for j in i] for i in copy_grid[1]]
+            [lines[i*(width-1):(i+1)*(width-1)] for i in range(height)],
+            [lines[vertical+i*(height-1):vertical+(i+1)*(height-1)] for i in range(width)]
         ]
         # This means grid[0][0][0] is the top left horizontal line
         # grid[1][0][0] is the top left vertical line
-        # Then build the box objects in a 2d list
-        self.boxes = [[0 for i in range(self.width-1)] for j in range(self.height-1)]
-        for i in range(self.height-1):
-            for j in range(self.width-1):
-                # Boxes are constructed with lines in the order [top, bottom, left, right]
-                self.boxes[i][j] = Box(self.grid[0][i][j], self.grid[0][i+1][j], self.grid[1][j][i], self.grid[1][j+1][i], copy_boxes[i][j].owner)
+        # Boxes are constructed with lines in the order [top, bottom, left, right]
+        if copy_boxes is None:
+            boxes = [Box(lines[t], lines[b], lines[l], lines[r], 0, 0) for t, b, l, r in self.topology.boxEdges]
+        else:
+            boxes = [Box(lines[t], lines[b], lines[l], lines[r], old.owner, old.sides)
+                for (t, b, l, r), old in zip(self.topology.boxEdges, copy_boxes)]
+        # Boxes by box index, for looking them up from the topology.
+        self.boxList = boxes
+        # Then put the boxes in a 2d list
+        self.boxes = [boxes[i*(width-1):(i+1)*(width-1)] for i in range(height-1)]
 
     def get_copy(self):
         """
-        Game returns a deep copy of itself.
+        Game returns a deep copy of itself, of the same variant.
         Returns:
             Game
         """
-        return Game(
-            self.width,
-            self.height,
-            self.maxPlayers,
-            self.currentPlayer,
-            self.legalMoves.copy(),
-            self.grid,
-            self.boxes,
-            self.movesMade.copy())
+        new = type(self).__new__(type(self))
+        new.width = self.width
+        new.height = self.height
+        new.currentPlayer = self.currentPlayer
+        new.maxPlayers = self.maxPlayers
+        new.legalMoves = self.legalMoves.copy()
+        new.movesMade = self.movesMade.copy()
+        new.topology = self.topology
+        new.moveStack = []
+        new.build_from_copy(self.grid, self.boxes)
+        # The counters and hash are already known so don't need working out again.
+        new.scores = self.scores.copy()
+        new.sideCounts = self.sideCounts.copy()
+        new.hash = self.hash
+        return new
+
+    def count_boxes(self):
+        """
+        Counts the boxes owned by each player and the boxes with each number
+        of sides drawn from scratch. take_turn keeps both up to date, so
+        this is only needed on creation.
+        """
+        # Boxes owned by each player. 0 is unclaimed.
+        self.scores = {player: 0 for player in range(max(self.maxPlayers, 2)+1)}
+        # Number of boxes with 0, 1, 2, 3 and 4 sides drawn.
+        self.sideCounts = [0, 0, 0, 0, 0]
+        for row in self.boxes:
+            for box in row:
+                self.scores[box.owner] += 1
+                self.sideCounts[box.sides] += 1
+
+    def change_sides(self, move, amount):
+        """
+        Adds amount to the sides drawn of the boxes next to a line, keeping the
+        side counts up to date.
+        Args:
+            move: 3-tuple(int)
+            amount: int, 1 when drawing the line and -1 when erasing it.
+        """
+        for box in self.get_boxes_for_line(move):
+            self.sideCounts[box.sides] -= 1
+            box.sides += amount
+            self.sideCounts[box.sides] += 1
+
+    def compute_hash(self):
+        """
+        Calculates the Zobrist hash of the position from scratch. This is the
+        XOR of the keys for every drawn line and the player whose turn it is.
+        take_turn keeps self.hash updated so this is only needed on creation.
+        Returns:
+            int
+        """
+        h = self.topology.zobristPlayers[self.currentPlayer]
+        for e, move in enumerate(self.topology.moves):
+            if self.grid[move[0]][move[1]][move[2]]:
+                h ^= self.topology.zobristEdges[e]
+        return h
 
     def increment_player(self):
         """
@@ -98,31 +177,73 @@ class Game:
 
     def take_turn(self, move):
         """
-        Takes a turn for next player. Claims a line.
-        Returns bool for success. True if player secures a box.
+        Takes a turn for the current player by drawing a line. The line is
+        taken out of the legal moves, and the turn passes on unless it
+        completed a box. The move is pushed on the move stack so undo_move
+        can take it back. An illegal move is reported and changes nothing.
+        Returns nothing; use get_scores or currentPlayer to see the result.
         Args:
-            player: int
             move: 3-tuple(int)
-        Returns:
-            bool
         """
         if self.is_legal_move(move):
-            move_results = []
+            player = self.currentPlayer
+            oldHash = self.hash
             # Attempt to claim the line.
             self.grid[move[0]][move[1]][move[2]].draw(self.currentPlayer)
-            # Take the move made out of the list of legal moves.
+            self.change_sides(move, 1)
+            # Take the move made out of the set of legal moves.
             self.legalMoves.remove(move)
             self.movesMade.append(move)
-            #self.movesMade.append("{} - {}".format(self.currentPlayer, move))
             #print("Made move {}".format(move))
             # Check the boxes associated with the line claimed.
-            if not self.check_boxes_for_line(move):
+            claimed = self.check_boxes_for_line(move)
+            self.scores[player] += len(claimed)
+            self.scores[0] -= len(claimed)
+            if not claimed:
                 # If no box has been claimed this round, increment the player counter
                 # Otherwise, it is still this player's turn.
                 self.increment_player()
+            # Update the hash for the line drawn and the player to move.
+            self.hash ^= (self.topology.zobristEdges[self.topology.index[move]]
+                ^ self.topology.zobristPlayers[player]
+                ^ self.topology.zobristPlayers[self.currentPlayer])
+            self.moveStack.append((move, claimed, player, oldHash))
         else:
             print("Illegal move {}".format(move))
 
+    def undo_move(self):
+        """
+        Takes back the last turn made with take_turn. The line is erased, any
+        boxes it claimed are released and it is that player's turn again.
+        Returns:
+            3-tuple(int): the move that was undone, or None if there was nothing to undo.
+        """
+        if not self.moveStack:
+            print("No moves to undo")
+            return None
+        move, claimed, player, self.hash = self.moveStack.pop()
+        self.grid[move[0]][move[1]][move[2]].erase()
+        self.change_sides(move, -1)
+        for box in claimed:
+            box.clear()
+        self.scores[player] -= len(claimed)
+        self.scores[0] += len(claimed)
+        self.legalMoves.add(move)
+        self.movesMade.pop()
+        self.currentPlayer = player
+        return move
+
+    def block_line(self, move):
+        """
+        Draws a line that belongs to neither player, as if by player 3. Used by
+        the game variants to fill in lines before the game starts.
+        Args:
+            move: 3-tuple(int)
+        """
+        self.grid[move[0]][move[1]][move[2]].draw(3)
+        self.change_sides(move, 1)
+        self.legalMoves.remove(move)
+        self.hash ^= self.topology.zobristEdges[self.topology.index[move]]
 
     def check_boxes_for_line(self, move):
         """
@@ -131,32 +252,32 @@ class Game:
         Args:
             move: 3-tuple(int)
         Returns:
-            bool: True if box is claimed, False if not.
-        """
-        # Make a list for the results as there could be 1 or 2.
-        results = []
-        if move[0] == 0:
-            # If the Line is on an edge ([1 0 0], [0 0 0], etc) then it only has one
-            # associated box. Check that box.
-            if move[1] == 0:
-                results.append(self.boxes[move[1]][move[2]].check_completed(self.currentPlayer))
-            elif move[1] == self.height-1:
-                results.append(self.boxes[move[1]-1][move[2]].check_completed(self.currentPlayer))
-            # If the Line is not on the edge, it connects to two boxes. Check both.
-            else:
-                results.append(self.boxes[move[1]-1][move[2]].check_completed(self.currentPlayer))
-                results.append(self.boxes[move[1]][move[2]].check_completed(self.currentPlayer))
-        else:
-            if move[1] == 0:
-                results.append(self.boxes[move[2]][move[1]].check_completed(self.currentPlayer))
-            elif move[1] == self.width-1:
-                results.append(self.boxes[move[2]][move[1]-1].check_completed(self.currentPlayer))
-            else:
-                results.append(self.boxes[move[2]][move[1]-1].check_completed(self.currentPlayer))
-                results.append(self.boxes[move[2]][move[1]].check_completed(self.currentPlayer))
-        # If any boxes were claimed, any(results) will return true.
-        return any(results)
+            List[Box]: The boxes claimed by this line. Empty if none were claimed.
+        """
+        # Only return the boxes that were claimed by this line.
+        return [box for box in self.get_boxes_for_line(move) if box.check_completed(self.currentPlayer)]
 
+    def get_boxes_for_line(self, move):
+        """
+        Finds the boxes either side of a line.
+        Args:
+            move: 3-tuple(int)
+        Returns:
+            List[Box]: 1 box for lines on the edge of the board, otherwise 2.
+        """
+        # The topology already knows which boxes each line borders.
+        boxList = self.boxList
+        return [boxList[b] for b in self.topology.edgeBoxes[self.topology.index[move]]]
+
+    def get_box_sides_for_line(self, move):
+        """
+        Finds how many sides are completed in each of the boxes next to a line.
+        Args:
+            move: 3-tuple(int)
+        Returns:
+            List[int]
+        """
+        return [box.sides_completed() for box in self.get_boxes_for_line(move)]
 
     def is_legal_move(self, move):
         """
@@ -170,7 +291,9 @@ class Game:
 
     def get_all_legal_moves(self, generate=False):
         """
-        Finds all legal moves that can be made. Returns these as a list.
+        Finds all legal moves that can be made. Returns these as a new list,
+        in no particular order, so sort it if a fixed order is needed.
+        Use iter_legal_moves to look through the moves without copying them.
         Args:
             generate(Bool): If True, force the game to make a new list of legal
                 moves
@@ -182,18 +305,28 @@ class Game:
         # Once this list has been created, it can be stored and moves that are made
         # can be removed from the list, preventing this costly move generation.
         if self.legalMoves is False or generate:
-            self.legalMoves = []
-            o = 0
-            for i in range(self.height):
-                for j in range(self.width-1):
-                    if not self.grid[o][i][j]:
-                        self.legalMoves.append((o, i, j))
-            o = 1
-            for i in range(self.width):
-                for j in range(self.height-1):
-                    if not self.grid[o][i][j]:
-                        self.legalMoves.append((o, i, j))
-        return self.legalMoves.copy()
+            grid = self.grid
+            self.legalMoves = MoveSet(move for move in self.topology.moves if not grid[move[0]][move[1]][move[2]])
+        return list(self.legalMoves)
+
+    def iter_legal_moves(self):
+        """
+        Iterate over the legal moves without copying them, in no particular
+        order. The game must not be changed while iterating.
+        Returns:
+            Iterator[3-tuple(int)]
+        """
+        return iter(self.legalMoves)
+
+    def random_legal_move(self, rng=random):
+        """
+        Pick a random legal move in constant time.
+        Args:
+            rng(random.Random): source of randomness
+        Returns:
+            3-tuple(int)
+        """
+        return self.legalMoves.random_choice(rng)
 
     def is_finished(self):
         """
@@ -218,12 +351,7 @@ class Game:
         Returns:
             dict{int:int}
         """
-        scores = {0:0, 1:0, 2:0}
-        for i in range(self.height-1):
-            for j in range(self.width-1):
-                owner = self.boxes[i][j].owner
-                scores[owner] += 1
-        return scores
+        return self.scores.copy()
 
     def check_score(self, player):
         """
@@ -233,12 +361,28 @@ class Game:
         Returns:
             int
         """
-        score = 0
-        for i in range(self.height-1):
-            for j in range(self.width-1):
-                if self.boxes[i][j].owner == player:
-                    score += 1
-        return score
+        return self.scores.get(player, 0)
+
+    def get_side_counts(self):
+        """
+        Count how many boxes have 0, 1, 2, 3 and 4 sides completed.
+        Returns:
+            List[int]
+        """
+        return self.sideCounts.copy()
+
+    def get_edge_mask(self):
+        """
+        Get the drawn lines as a bitmask, with bit e set if edge e of the
+        board topology is drawn.
+        Returns:
+            int
+        """
+        mask = 0
+        for e, move in enumerate(self.topology.moves):
+            if self.grid[move[0]][move[1]][move[2]]:
+                mask |= 1 << e
+        return mask
 
     def winner(self):
         """
@@ -281,6 +425,35 @@ class Game:
             print("Saving to results file {} failed.".format(filename))
             #print(e)
 
+    def get_record(self, players=("", ""), seed=None):
+        """
+        Packs the game into a binary game record. See GameRecord.
+        Args:
+            players: 2-tuple(str), names of player one and player two
+            seed: int, seed the game was played with
+        Returns:
+            bytes
+        """
+        blocked = [move for move in self.topology.moves if self.grid[move[0]][move[1]][move[2]].owner == 3]
+        scores = self.get_scores()
+        return GameRecord.encode_record(self.width, self.height, self.variant, players, seed, blocked, self.movesMade, (scores[1], scores[2]))
+
+    def save_record(self, filename, players=("", ""), seed=None):
+        """
+        Appends the game to a binary results file, as a much smaller
+        alternative to save_statistics. ReadStatistics.read_records reads
+        the games back.
+        Args:
+            filename: str
+            players: 2-tuple(str), names of player one and player two
+            seed: int, seed the game was played with
+        """
+        try:
+            with open(filename, "ab") as outfile:
+                outfile.write(self.get_record(players, seed))
+        except Exception as e:
+            print("Saving to results file {} failed.".format(filename))
+
     def print_grid(self):
         """
         Prints an ascii representation of the board.
@@ -312,12 +485,21 @@ class Game:
                         else:
                             print("¦")
 
+    def __hash__(self):
+        """
+        Builtin hash method, using the incrementally updated Zobrist hash.
+        Games that are equal always have the same hash.
+        """
+        return self.hash
+
     def __eq__(self, other):
         """
         Builtin equality method for seeing if games are equal.
         Games are equal if they have the same dimensions, all of the lines
         are owned by the same players and it is the same players turn.
         """
+        if not isinstance(other, Game):
+            return NotImplemented
         if self.width != other.width:
             return False
 
@@ -346,6 +346,8 @@ class GameFrame(QWidget):
         self.game = game
         self.width = game.width
         self.height = game.height
+        # Board geometry shared with the game.
+        self.topology = game.topology
         self.resultsFilename = filename
         self.boxSize = 50
         self.lineWidth = 10
@@ -479,7 +481,7 @@ class GameFrame(QWidget):
         Enables all of the buttons that should be enabled.
         """
         # Enable all of the buttons that correspond to legal moves.
-        for move in self.game.get_all_legal_moves():
+        for move in self.game.iter_legal_moves():
             self.buttonGrid[move[0]][move[1]][move[2]].setEnabled(True)
 
 
@@ -491,32 +493,19 @@ class GameFrame(QWidget):
         self.titleLabel.setText("Player {}".format(self.game.currentPlayer))
         self.titleLabel.resize(self.titleLabel.sizeHint())
         # update line colours
-        for i in range(self.height):
-            for j in range(self.width-1):
-                line_owner = self.game.grid[0][i][j].owner
-                if line_owner == 1:
-                    self.buttonGrid[0][i][j].setStyleSheet("background-color: {}".format(self.p1Colour))
-                elif line_owner == 2:
-                    self.buttonGrid[0][i][j].setStyleSheet("background-color: {}".format(self.p2Colour))
-                elif line_owner == 3:
-                    self.buttonGrid[0][i][j].setStyleSheet("background-color: {}".format(self.blockedColour))
-        for i in range(self.width):
-            for j in range(self.height-1):
-                line_owner = self.game.grid[1][i][j].owner
-                if line_owner == 1:
-                    self.buttonGrid[1][i][j].setStyleSheet("background-color: {}".format(self.p1Colour))
-                elif line_owner == 2:
-                    self.buttonGrid[1][i][j].setStyleSheet("background-color: {}".format(self.p2Colour))
-                elif line_owner == 3:
-                    self.buttonGrid[1][i][j].setStyleSheet("background-color: {}".format(self.blockedColour))
+        lineColours = {1: self.p1Colour, 2: self.p2Colour, 3: self.blockedColour}
+        for o, i, j in self.topology.moves:
+            line_owner = self.game.grid[o][i][j].owner
+            if line_owner in lineColours:
+                self.buttonGrid[o][i][j].setStyleSheet("background-color: {}".format(lineColours[line_owner]))
         # Update grid for box numbers
-        for i in range(self.height-1):
-            for j in range(self.width-1):
-                owner = self.game.boxes[i][j].owner
-                if owner != 0:
-                    # This sets the text for owner number and sets box colour.
-                    self.boxes[i][j].setText("{}".format(owner))
-                    self.boxes[i][j].setStyleSheet("background-color: {}".format(self.players[owner-1].colour))
+        for b in range(self.topology.noBoxes):
+            i, j = self.topology.box_coords(b)
+            owner = self.game.boxes[i][j].owner
+            if owner != 0:
+                # This sets the text for owner number and sets box colour.
+                self.boxes[i][j].setText("{}".format(owner))
+                self.boxes[i][j].setStyleSheet("background-color: {}".format(self.players[owner-1].colour))
         # Force the GUI to update. This is for games with no human player.
         QApplication.processEvents()
         # If the game isn't done yet, go back to the main loop.
@@ -574,14 +563,8 @@ class GameFrame(QWidget):
         """
         Disables all buttons that are part of the game grid.
         """
-        o = 0
-        for i in range(self.height):
-            for j in range(self.width-1):
-                self.buttonGrid[o][i][j].setEnabled(False)
-        o = 1
-        for i in range(self.width):
-            for j in range(self.height-1):
-                self.buttonGrid[o][i][j].setEnabled(False)
+        for o, i, j in self.topology.moves:
+            self.buttonGrid[o][i][j].setEnabled(False)
 
     def replay(self):
         """
@@ -590,6 +573,15 @@ class GameFrame(QWidget):
         self.sf = StartFrame()
         self.close()
 
+    def closeEvent(self, event):
+        """
+        Close the players when the frame closes, so AI players searching with
+        several workers shut their processes down.
+        """
+        for player in self.players:
+            player.close()
+        super().closeEvent(event)
+
 class GameButton(QPushButton):
     """
     A very simple subclassed version of QPushButton that also holds a value.
@@ -1,5 +1,4 @@
 from .Game import Game
-import random
 
 class GameHandler:
     def __init__(self, width=4, height=4):
@@ -40,7 +39,7 @@ class GameHandler:
         Returns:
             3-tuple(int)
         """
-        move = random.choice(self.game.get_all_legal_moves())
+        move = self.game.random_legal_move()
         print("Making random move ({}, {}, {})".format(move[0], move[1], move[2]))
         return move
 
@@ -0,0 +1,113 @@
+try:
+    from Topology import get_topology
+except ModuleNotFoundError:
+    from DotsAndBoxes.Topology import get_topology
+import struct
+
+# Binary game records. A results file is a series of records, one per game,
+# each laid out as (all little-endian):
+#     header: magic b"DB", version, width, height, variant, seed (uint32),
+#         length of player one's name, length of player two's name
+#     the two names, UTF-8
+#     number of blocked lines, number of moves (uint16 each)
+#     the blocked lines then the moves, as edge indices from the board's
+#         Topology, one byte each or two on boards with over 256 lines
+#     player one's score, player two's score (uint16 each)
+# Records are only ever appended, so files can be written a game at a time
+# and read back one record at a time.
+
+MAGIC = b"DB"
+VERSION = 1
+# Variant codes
+VARIANTS = ("standard", "swedish", "random")
+HEADER = struct.Struct("<2sBBBBIBB")
+COUNTS = struct.Struct("<HH")
+SCORES = struct.Struct("<HH")
+
+def edge_format(width, height):
+    """
+    struct format for one edge index on a board.
+    Args:
+        width(int)
+        height(int)
+    Returns:
+        str: "B", or "H" for boards with more than 256 lines.
+    """
+    return "B" if get_topology(width, height).noEdges <= 256 else "H"
+
+def encode_record(width, height, variant, players, seed, blocked, moves, scores):
+    """
+    Pack one game into a record.
+    Args:
+        width(int)
+        height(int)
+        variant(str): name from VARIANTS
+        players(2-tuple(str)): names of player one and player two
+        seed(int): seed the game was played with, or None
+        blocked(List[3-tuple(int)]): lines drawn before the game started
+        moves(List[3-tuple(int)]): moves in the order they were made
+        scores(2-tuple(int)): final scores of player one and player two
+    Returns:
+        bytes
+    """
+    if variant not in VARIANTS:
+        raise ValueError("Unknown variant {}".format(variant))
+    # Names are cut to 255 bytes, dropping any character split by the cut.
+    names = [str(name).encode("utf-8")[:255].decode("utf-8", "ignore").encode("utf-8") for name in players]
+    index = get_topology(width, height).index
+    edges = [index[move] for move in blocked] + [index[move] for move in moves]
+    return b"".join([
+        HEADER.pack(MAGIC, VERSION, width, height, VARIANTS.index(variant), (seed or 0) & 0xFFFFFFFF, len(names[0]), len(names[1])),
+        names[0], names[1],
+        COUNTS.pack(len(blocked), len(moves)),
+        struct.pack("<{}{}".format(len(edges), edge_format(width, height)), *edges),
+        SCORES.pack(scores[0], scores[1]),
+    ])
+
+def read_exactly(infile, size):
+    """
+    Read a number of bytes from a file, raising ValueError if it ends first.
+    Args:
+        infile(file): binary file
+        size(int)
+    Returns:
+        bytes
+    """
+    data = infile.read(size)
+    if len(data) != size:
+        raise ValueError("Record cut short")
+    return data
+
+def decode_record(infile):
+    """
+    Read the next record from a binary file.
+    Args:
+        infile(file): binary file, positioned at the start of a record
+    Returns:
+        dict: with width, height, variant, players, seed, blocked, moves and
+            scores, as passed to encode_record. None at the end of the file.
+    """
+    data = infile.read(HEADER.size)
+    if not data:
+        return None
+    if len(data) != HEADER.size:
+        raise ValueError("Record cut short")
+    magic, version, width, height, variant, seed, p1length, p2length = HEADER.unpack(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not a version {} game record".format(VERSION))
+    players = (read_exactly(infile, p1length).decode("utf-8"), read_exactly(infile, p2length).decode("utf-8"))
+    noBlocked, noMoves = COUNTS.unpack(read_exactly(infile, COUNTS.size))
+    edgeFormat = "<{}{}".format(noBlocked+noMoves, edge_format(width, height))
+    edges = struct.unpack(edgeFormat, read_exactly(infile, struct.calcsize(edgeFormat)))
+    scores = SCORES.unpack(read_exactly(infile, SCORES.size))
+    moves = get_topology(width, height).moves
+    return {
+        "width": width,
+        "height": height,
+        "variant": VARIANTS[variant],
+        "players": players,
+        "seed": seed,
+        "blocked": [moves[e] for e in edges[:noBlocked]],
+        "moves": [moves[e] for e in edges[noBlocked:]],
+        "scores": scores,
+    }
@@ -13,6 +13,9 @@ class SwedishGame(Game):
     Subclass for the 'swedish' variant of the game board.
     All of the side pieces are filled in to begin with.
     """
+    __slots__ = ()
+    variant = "swedish"
+
     def __init__(self, width, height, maxPlayers=2, curPlayer=1, legalMoves=False, copy_grid=None, copy_boxes=None, movesMade=None):
         """
         Initialise the game with given width and height.
@@ -34,20 +37,10 @@ class SwedishGame(Game):
         """
         Makes all of the outside edges inaccessible.
         """
-        # first find all of the moves we want to block
-        movesToMake = []
-        # top and bottom edges
-        for i in range(self.width-1):
-            movesToMake.append((0,0,i))
-            movesToMake.append((0,self.height-1,i))
-        # left and right edges
-        for i in range(self.height-1):
-            movesToMake.append((1,0,i))
-            movesToMake.append((1,self.width-1,i))
-        # now make those moves, as if we are player 3.
-        for move in movesToMake:
-            self.grid[move[0]][move[1]][move[2]].draw(3)
-            self.legalMoves.remove(move)
+        # The topology knows which lines are around the outside.
+        # Block those lines, as if we are player 3.
+        for e in self.topology.borderEdges:
+            self.block_line(self.topology.moves[e])
 
 
 class RandomGame(Game):
@@ -55,6 +48,9 @@ class RandomGame(Game):
     Subclass for a 'random' variant of the game board.
     A random selection of lines are filled in automatically.
     """
+    __slots__ = ()
+    variant = "random"
+
     def __init__(self, width, height, maxPlayers=2, curPlayer=1, legalMoves=False, copy_grid=None, copy_boxes=None, movesMade=None):
         super().__init__(width, height, maxPlayers, curPlayer, legalMoves, copy_grid, copy_boxes, movesMade)
         if copy_grid is None and copy_boxes is None:
@@ -75,5 +71,4 @@ class RandomGame(Game):
             movesToMake.append(legalMoves[i])
         # now make those moves, as if we are player 3.
         for move in movesToMake:
-            self.grid[move[0]][move[1]][move[2]].draw(3)
-            self.legalMoves.remove(move)
+            self.block_line(move)
@@ -1,4 +1,8 @@
 class Line:
+    # Lines only ever have an owner. Slots keep each one small, as a game
+    # has one per edge and search trees hold many games.
+    __slots__ = ("owner",)
+
     def __init__(self, owner=0):
         """
         Initialise new Line object.
@@ -20,6 +24,12 @@ class Line:
             return True
         return False
 
+    def erase(self):
+        """
+        Remove the line's owner. Used when a move is undone.
+        """
+        self.owner = 0
+
     def __bool__(self):
         """
         Define truth value for line. If the line is owned, Line is True.
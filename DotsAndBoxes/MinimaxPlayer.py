@@ -1,16 +1,32 @@
 try:
     import BasicPlayers
+    import EndgameSolver
+    from BitboardGame import BitboardGame
+    import Symmetry
+    from TranspositionTable import TranspositionTable, EXACT, LOWER, UPPER
 except ModuleNotFoundError:
     import DotsAndBoxes.BasicPlayers as BasicPlayers
+    import DotsAndBoxes.EndgameSolver as EndgameSolver
+    from DotsAndBoxes.BitboardGame import BitboardGame
+    import DotsAndBoxes.Symmetry as Symmetry
+    from DotsAndBoxes.TranspositionTable import TranspositionTable, EXACT, LOWER, UPPER
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing
 import time
 
+class SearchTimeout(Exception):
+    """
+    Raised inside a search when its deadline has passed.
+    """
+    pass
+
 class MinimaxPlayer(BasicPlayers.RandomPlayer):
     """
     Player that implements minimax. Inherits random player for random moves.
     Minimax algorithm with alpha-beta pruning for speed and iterative deepening
     for a time limit.
     """
-    def __init__(self, playerIndex, colour="red", timeLimit=0.5, maxDepth=20):
+    def __init__(self, playerIndex, colour="red", timeLimit=0.5, maxDepth=20, ttMemory=16, solveEndgames=True, workers=1, symmetryPlies=0):
         """
         Override for Minimax player to include time limit & max depth.
         This is the time limit given to the player to choose a move, in seconds.
@@ -19,11 +35,40 @@ class MinimaxPlayer(BasicPlayers.RandomPlayer):
             colour(str): Colour for the UI to render. Defaults to Red
             timeLimit(int/float): Time limit in seconds for moves
             maxDepth(int): Max depth the computer player can reach.
+            ttMemory(int/float): Megabytes for the transposition table. 0 turns it off.
+            solveEndgames(bool): Score loony endgames exactly with EndgameSolver.
+            workers(int): Number of processes to search root moves with. 1 searches
+                in this process only.
+            symmetryPlies(int): Positions up to this many moves from the root
+                are stored in the transposition table under their symmetry
+                canonical key, so reflections and rotations share an entry.
+                0 turns this off. Working out the key costs more than the
+                plain hash, so it is only worth it near the root.
         """
         self.index = playerIndex
         self.colour = colour
         self.timeLimit = timeLimit
         self.maxDepth = maxDepth
+        self.ttMemory = ttMemory
+        self.workers = workers
+        # Worker processes are only started on the first parallel search.
+        self.pool = None
+        self.sharedAlpha = None
+        # Time after which a search gives up. None means no limit.
+        self.deadline = None
+        # The table is kept between moves and between iterative deepening passes.
+        if ttMemory:
+            self.table = TranspositionTable(ttMemory)
+        else:
+            self.table = None
+        self.solveEndgames = solveEndgames
+        self.symmetryPlies = symmetryPlies
+        # Number of positions searched, for measuring the search.
+        self.nodes = 0
+        # Move ordering heuristics. Killers are moves that caused a cut off at
+        # each ply, history scores every move that has caused a cut off anywhere.
+        self.killers = {}
+        self.history = {}
 
     def chooseMove(self, game):
         """
@@ -32,31 +77,57 @@ class MinimaxPlayer(BasicPlayers.RandomPlayer):
         iterative deepening.
         When the time limit is reached, the move with the best score so far is
         chosen.
+        The search runs on a BitboardGame copy of the game, where moves are
+        much cheaper to make and undo.
         Args:
-            game(Game): Game that the player is making a move in
+            game(Game): Game that the player is making a move in.
         Returns:
             3-Tuple[int]: move to be made.
         """
-        moves = game.get_all_legal_moves()
-        bestMove = (0, 0, 0)
-        bestScore = -10000
+        game = BitboardGame.from_game(game)
+        if self.workers > 1:
+            return self.chooseMoveParallel(game)
+        moves = self.orderMoves(game, game.get_all_legal_moves())
+        bestMove = moves[0] if moves else (0, 0, 0)
         currentMaxDepth = 1
         startTime = time.time()
+        if self.table is not None:
+            self.table.new_search()
+        # Killers from the last move are for different positions, but keep
+        # a fading memory of which moves were good.
+        self.killers = {}
+        self.history = {move: score // 2 for move, score in self.history.items()}
         # Search at max depth = 1 initially, and then increment the depth.
         # Keep incrementing until the time limit has been reached, then return
         # the best move found so far. This is iterative deepening.
-        while time.time() - startTime <= self.timeLimit and currentMaxDepth <= self.maxDepth:
+        while time.time() - startTime <= self.timeLimit and currentMaxDepth <= self.maxDepth and moves:
+            # The best move from the last depth is searched first, and its
+            # score is used as alpha for the rest, so they only have to show
+            # they can't beat it. Alpha is one lower so equal scores are exact.
+            depthBest = None
+            depthScore = -10000
+            scores = {}
             for move in moves:
-                # simulate the move and find the score
-                copyGame = self.makeMove(game, move)
-                score = self.getScore(copyGame, currentMaxDepth, -10000, 10000)
-                # The move that returns the greatest score gets chosen.
-                if score >= bestScore:
-                    bestScore = score
-                    bestMove = move
+                # simulate the move and find the score, then take it back
+                game.take_turn(move)
+                score = self.getScore(game, currentMaxDepth, depthScore - 1, 10000)
+                game.undo_move()
+                scores[move] = score
+                # The move that returns the greatest score gets chosen, ties
+                # going to the later move in the usual order.
+                if depthBest is None or score > depthScore or (score == depthScore and move > depthBest):
+                    depthBest = move
+                    depthScore = score
                 # Break if we have reached the end of the time limit.
                 if time.time() - startTime >= self.timeLimit:
                     break
+            # Every move searched this depth was measured against the one
+            # searched first, so even a part searched depth can be used.
+            bestMove = depthBest
+            # Search the best move first next time, then the rest by score.
+            moves.sort(key=lambda m: -scores.get(m, -10000))
+            moves.remove(bestMove)
+            moves.insert(0, bestMove)
             # Increment the current max depth for iterative deepening.
             currentMaxDepth += 1
 
@@ -66,7 +137,85 @@ class MinimaxPlayer(BasicPlayers.RandomPlayer):
         else:
             return self.randomMove(game)
 
-    def getScore(self, game, depth, alpha, beta):
+    def chooseMoveParallel(self, game):
+        """
+        Parallel version of chooseMove. Root moves are shared out between a
+        pool of worker processes, each with its own transposition table.
+        Each depth, the best move from the last depth is searched first on its
+        own (the 'young brothers wait' rule) so its score can be used as the
+        alpha bound for all the others, which are then searched at once. Workers
+        share the best score found so far so later moves are searched with a
+        tighter bound.
+        Only completed depths are used to choose the move.
+        Args:
+            game(Game): Game that the player is making a move in.
+        Returns:
+            3-Tuple[int]: move to be made.
+        """
+        pool = self.getPool()
+        startTime = time.time()
+        deadline = startTime + self.timeLimit
+        moves = self.orderMoves(game, game.get_all_legal_moves())
+        bestMove = moves[0] if moves else None
+        currentMaxDepth = 1
+        while time.time() < deadline and currentMaxDepth <= self.maxDepth and moves:
+            # Search the eldest brother first, without a bound.
+            self.sharedAlpha.value = -10000
+            eldest = pool.submit(_search_root_move, game, moves[0], currentMaxDepth, deadline)
+            move, depthScore = eldest.result()
+            if depthScore is None:
+                break
+            depthBest = move
+            # Then the rest in parallel.
+            futures = [pool.submit(_search_root_move, game, m, currentMaxDepth, deadline) for m in moves[1:]]
+            scores = {depthBest: depthScore}
+            finished = True
+            for future in as_completed(futures):
+                move, score = future.result()
+                if score is None:
+                    finished = False
+                    continue
+                scores[move] = score
+                # Break ties the same way as the serial search, by move order.
+                if score > depthScore or (score == depthScore and move > depthBest):
+                    depthBest, depthScore = move, score
+            if not finished:
+                break
+            bestMove = depthBest
+            # Search the best move first next time, then the rest by score.
+            moves.sort(key=lambda m: -scores[m])
+            moves.remove(bestMove)
+            moves.insert(0, bestMove)
+            currentMaxDepth += 1
+
+        if bestMove is not None and game.is_legal_move(bestMove):
+            return bestMove
+        else:
+            return self.randomMove(game)
+
+    def getPool(self):
+        """
+        Get the pool of worker processes, starting it if needed.
+        Returns:
+            ProcessPoolExecutor
+        """
+        if self.pool is None:
+            self.sharedAlpha = multiprocessing.Value("i", -10000)
+            self.pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(self.index, self.maxDepth, self.ttMemory, self.solveEndgames, self.sharedAlpha, self.symmetryPlies))
+        return self.pool
+
+    def close(self):
+        """
+        Shut down any worker processes.
+        """
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+            self.pool = None
+
+    def getScore(self, game, depth, alpha, beta, ply=1):
         """
         The recursive part of the minimax algorithm. Implements alpha-beta pruning.
         This will recursively search the tree to find the scores available at the bottom.
@@ -75,14 +224,56 @@ class MinimaxPlayer(BasicPlayers.RandomPlayer):
             depth(int): current depth of search.
             alpha(int): alpha value
             beta(int): beta value
+            ply(int): how many moves from the root this position is.
         Returns:
             int
         """
+        self.nodes += 1
+        if self.deadline is not None and time.time() > self.deadline:
+            raise SearchTimeout()
+        # Once every move gives boxes away the rest of the game can be solved
+        # exactly from its chains and loops, without searching any further.
+        if self.solveEndgames:
+            net = EndgameSolver.solve_game(game)
+            if net is not None:
+                if game.currentPlayer != self.index:
+                    net = -net
+                return self.boxScore(game) + 10*net
         # When we're at the bottom of the tree, return static evaluation
         if depth <= 0 or game.is_finished():
             return self.evaluate(game)
 
-        moves = game.get_all_legal_moves()
+        # Look the position up in the transposition table. Boxes already won
+        # are not part of the hash, so scores are stored relative to them.
+        hashMove = None
+        if self.table is not None:
+            offset = self.boxScore(game)
+            # Near the root use the key shared by all symmetric positions.
+            # Moves in the table are then stored for the canonical position.
+            key, transform = game.hash, 0
+            if ply <= self.symmetryPlies:
+                key, transform = Symmetry.canonical_key(game)
+            entry = self.table.probe(key)
+            if entry is not None:
+                score, entryDepth, flag, hashMove = entry
+                if transform and hashMove is not None:
+                    hashMove = Symmetry.untransform_move(game, hashMove, transform)
+                # Only use the score if it was searched at least as deep.
+                if entryDepth >= depth:
+                    score += offset
+                    if flag == EXACT:
+                        return score
+                    elif flag == LOWER:
+                        alpha = max(alpha, score)
+                    else:
+                        beta = min(beta, score)
+                    if beta <= alpha:
+                        return score
+
+        # Keep the window the moves are searched with to classify the result.
+        alphaStart, betaStart = alpha, beta
+        moves = self.orderMoves(game, game.iter_legal_moves(), hashMove, ply)
+        bestMove = None
         # Store the current player
         currentPlayer = game.currentPlayer
         # set bestScore to either high or low value depending on whose turn it is
@@ -94,22 +285,105 @@ class MinimaxPlayer(BasicPlayers.RandomPlayer):
             bestScore = 10000
             maximise = False
         for move in moves:
-            # Make the move and get the next state of the game.
-            copyGame = self.makeMove(game, move)
+            # Make the move in place, search the next state of the game and
+            # then undo the move again. This saves copying the game at every node.
+            game.take_turn(move)
             # recursive call
-            score = self.getScore(copyGame, depth-1, alpha, beta)
+            score = self.getScore(game, depth-1, alpha, beta, ply+1)
+            game.undo_move()
             # Different actions depending on wether this is a min node or max node
             if maximise:
-                bestScore = max(score, bestScore)
+                if score > bestScore:
+                    bestScore = score
+                    bestMove = move
                 alpha = max(alpha, bestScore)
             else:
-                bestScore = min(score, bestScore)
+                if score < bestScore:
+                    bestScore = score
+                    bestMove = move
                 beta = min(beta, bestScore)
             # Alpha - beta pruning.
             if beta <= alpha:
+                self.updateOrdering(game, move, depth, ply)
                 break
+        if self.table is not None:
+            # A score outside the window is only a bound on the real score.
+            if bestScore <= alphaStart:
+                flag = UPPER
+            elif bestScore >= betaStart:
+                flag = LOWER
+            else:
+                flag = EXACT
+            if transform and bestMove is not None:
+                bestMove = Symmetry.transform_move(game, bestMove, transform)
+            self.table.store(key, depth, bestScore - offset, flag, bestMove)
         return bestScore
 
+    def orderMoves(self, game, moves, hashMove=None, ply=1):
+        """
+        Sorts moves so the ones most likely to be best are searched first,
+        which lets alpha-beta prune much more of the tree.
+        The order is: the best move from the transposition table, moves that
+        complete a box, killer moves, other moves that don't give a box a third
+        side (best history first) and finally moves that give away a box.
+        Args:
+            game(Game): game state the moves are for
+            moves(Iterable[3-tuple(int)]): moves to sort
+            hashMove(3-tuple(int)): best move stored for this position, if any
+            ply(int): how many moves from the root this position is.
+        Returns:
+            List[3-tuple(int)]
+        """
+        killers = self.killers.get(ply, ())
+        history = self.history
+        ranked = []
+        for move in moves:
+            sides = game.get_box_sides_for_line(move)
+            if move == hashMove:
+                rank = 0
+            elif 3 in sides:
+                rank = 1
+            elif 2 in sides:
+                rank = 4
+            elif move in killers:
+                rank = 2
+            else:
+                rank = 3
+            ranked.append((rank, -history.get(move, 0), move))
+        ranked.sort()
+        return [move for rank, h, move in ranked]
+
+    def updateOrdering(self, game, move, depth, ply):
+        """
+        Record a move that caused a cut off in the killer and history tables.
+        Captures are already searched first so they are not recorded.
+        Args:
+            game(Game): game state the move was made in
+            move(3-tuple(int)): the move
+            depth(int): depth remaining when the cut off happened
+            ply(int): how many moves from the root this position is.
+        """
+        if 3 in game.get_box_sides_for_line(move):
+            return
+        killers = self.killers.setdefault(ply, [])
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[2:]
+        self.history[move] = self.history.get(move, 0) + depth*depth
+
+    def boxScore(self, game):
+        """
+        The part of the evaluation that comes from boxes already won.
+        Args:
+            game(Game): Game state to score
+        Returns:
+            int
+        """
+        scores = game.get_scores()
+        if self.index == 1:
+            return 10*(scores[1] - scores[2])
+        return 10*(scores[2] - scores[1])
+
     def evaluate(self, game):
         """
         Evaluate a particular game state. Get a static score.
@@ -130,52 +404,59 @@ class MinimaxPlayer(BasicPlayers.RandomPlayer):
         # Remove 10 for every box opponent has
         score -= 10*scores[otherIndex]
         # Evaluation needs to be different depending on whose turn it is.
-        # If it's our turn next then we want boxes to complete
+        sideCounts = game.get_side_counts()
+        # If it's our turn next then we want boxes to complete.
+        # Only two sides, we don't want to make the third.
+        # Three sides means we can complete the fourth and get points.
         if game.currentPlayer == self.index:
-            for i in range(game.height-1):
-                for j in range(game.width-1):
-                    no_sides = game.boxes[i][j].sides_completed()
-                    # 0 or 1. Don't care
-                    if no_sides == 0 or no_sides == 1:
-                        pass
-                    # Only two, we don't want to make the third.
-                    elif no_sides == 2:
-                        score -= 1
-                    # Three sides means we can complete the fourth and get points
-                    elif no_sides == 3:
-                        score += 5
-
+            score -= sideCounts[2]
+            score += 5*sideCounts[3]
         # If it's their turn next we don't want them to complete boxes
         elif game.currentPlayer == otherIndex:
-            for i in range(game.height-1):
-                for j in range(game.width-1):
-                    no_sides = game.boxes[i][j].sides_completed()
-                    # 0 or 1. Don't care
-                    if no_sides == 0 or no_sides == 1:
-                        pass
-                    # Only two, we want them to make the third.
-                    elif no_sides == 2:
-                        score += 1
-                    # Three sides means they can complete the fourth and get points
-                    elif no_sides == 3:
-                        score -= 5
+            score += sideCounts[2]
+            score -= 5*sideCounts[3]
         return score
 
-    def makeMove(self, game, move):
-        """
-        Takes a game and a move, copies the game and makes the move in it.
-        Args:
-            game(Game): Game to be played in.
-            move(Tuple[int]): Move to make
-        Returns:
-            Game: Deep copy of Game with move made
-        """
-        copyGame = game.get_copy()
-        copyGame.take_turn(move)
-        return copyGame
-
     def __str__(self):
         """
         String representation for minimax player. Used for writing results filenames.
         """
         return "{}_minimax".format(self.index)
+
+# Each worker process keeps one player for all of the moves it searches, so
+# its transposition table and move ordering tables carry over between tasks.
+_worker = {}
+
+def _init_worker(index, maxDepth, ttMemory, solveEndgames, sharedAlpha, symmetryPlies=0):
+    """
+    Set up a worker process for parallel root search.
+    """
+    _worker["player"] = MinimaxPlayer(index, maxDepth=maxDepth, ttMemory=ttMemory, solveEndgames=solveEndgames, symmetryPlies=symmetryPlies)
+    _worker["alpha"] = sharedAlpha
+
+def _search_root_move(game, move, depth, deadline):
+    """
+    Search one root move in a worker process.
+    The best score found by any worker so far is used as the alpha bound. One
+    is taken off it so a move that ties with the best still gets an exact score.
+    Args:
+        game(Game): game before the move. This is the worker's own copy.
+        move(3-tuple(int)): root move to search
+        depth(int): depth to search to
+        deadline(float): time.time() value to give up at
+    Returns:
+        2-tuple(3-tuple(int), int): the move and its score, or None for the
+            score if the deadline passed.
+    """
+    player = _worker["player"]
+    sharedAlpha = _worker["alpha"]
+    player.deadline = deadline
+    game.take_turn(move)
+    try:
+        score = player.getScore(game, depth, sharedAlpha.value - 1, 10000)
+    except SearchTimeout:
+        return move, None
+    with sharedAlpha.get_lock():
+        if score > sharedAlpha.value:
+            sharedAlpha.value = score
+    return move, score
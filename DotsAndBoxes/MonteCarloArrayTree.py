@@ -0,0 +1,227 @@
+try:
+    from Rollout import get_policy
+except ModuleNotFoundError:
+    from DotsAndBoxes.Rollout import get_policy
+from array import array
+import time
+import math
+
+class ArrayMonteCarloTree:
+    """
+    Monte Carlo Tree with the same interface as MonteCarloTree, but nodes are
+    stored in parallel arrays rather than as MonteCarloNode objects.
+    Node k's statistics are visits[k] and wins[k], its parent is parent[k] and
+    the move that reached it is move[k], stored as an edge index. Children are
+    a linked list from firstChild[k] through nextSibling. Node 0 is the root.
+    No game is stored in the nodes. The root game is kept and the moves down
+    to a node are made in it and undone again after each rollout.
+    """
+    def __init__(self, index, timeLimit=2, c=1.4142, rolloutPolicy="random"):
+        """
+        Args:
+            index(int): player index in game
+            timeLimit(int/float): Time limit in seconds for moves
+            c(float): Exploration parameter
+            rolloutPolicy(str): "random" or "greedy". See MonteCarloTree.
+        """
+        self.index = index
+        self.c = c
+        self.timeLimit = timeLimit
+        self.policy = get_policy(rolloutPolicy)
+        self.game = None
+        self.clear()
+
+    def clear(self):
+        """
+        Empty the tree, leaving only a root node.
+        """
+        self.visits = array("d", [0.0])
+        self.wins = array("d", [0.0])
+        self.parent = array("i", [-1])
+        self.firstChild = array("i", [-1])
+        self.nextSibling = array("i", [-1])
+        self.move = array("i", [-1])
+
+    def __len__(self):
+        """
+        Number of nodes in the tree.
+        """
+        return len(self.visits)
+
+    def update(self, game):
+        """
+        Updates the tree with a new game. If the moves made since the last
+        update are in the tree, that part of the tree is kept.
+        Args:
+            game(Game): game state to start search from.
+        """
+        root = 0
+        if self.game is not None and game.movesMade[:len(self.game.movesMade)] != self.game.movesMade:
+            # Not the same game any more.
+            root = -1
+        elif self.game is not None:
+            index = game.topology.index
+            for move in game.movesMade[len(self.game.movesMade):]:
+                root = self.findChild(root, index[move])
+                if root == -1:
+                    break
+        if root == -1 or self.game is None:
+            self.clear()
+        elif root != 0:
+            self.reroot(root)
+        self.game = game.get_copy()
+
+    def findChild(self, node, move):
+        """
+        Find the child of a node reached by a move.
+        Args:
+            node(int): parent node
+            move(int): edge index
+        Returns:
+            int: child node, or -1 if there isn't one.
+        """
+        child = self.firstChild[node]
+        while child != -1:
+            if self.move[child] == move:
+                return child
+            child = self.nextSibling[child]
+        return -1
+
+    def reroot(self, node):
+        """
+        Make node the new root, keeping only its subtree. The subtree is copied
+        into fresh arrays so the rest of the tree is freed.
+        Args:
+            node(int): new root node
+        """
+        old = (self.visits, self.wins, self.firstChild, self.nextSibling, self.move)
+        oldVisits, oldWins, oldFirst, oldNext, oldMove = old
+        self.clear()
+        self.visits[0] = oldVisits[node]
+        self.wins[0] = oldWins[node]
+        # Breadth first copy. queue holds (old node, new node) pairs.
+        queue = [(node, 0)]
+        for oldNode, newNode in queue:
+            child = oldFirst[oldNode]
+            previous = -1
+            while child != -1:
+                newChild = self.addNode(newNode, oldMove[child], previous)
+                self.visits[newChild] = oldVisits[child]
+                self.wins[newChild] = oldWins[child]
+                queue.append((child, newChild))
+                previous = newChild
+                child = oldNext[child]
+
+    def addNode(self, parent, move, previous=-1):
+        """
+        Add a node to the tree as the last child of parent.
+        Args:
+            parent(int): parent node
+            move(int): edge index of the move to this node
+            previous(int): the parent's current last child, or -1 if it has none
+        Returns:
+            int: the new node
+        """
+        node = len(self.visits)
+        self.visits.append(0.0)
+        self.wins.append(0.0)
+        self.parent.append(parent)
+        self.firstChild.append(-1)
+        self.nextSibling.append(-1)
+        self.move.append(move)
+        if previous == -1:
+            self.firstChild[parent] = node
+        else:
+            self.nextSibling[previous] = node
+        return node
+
+    def makeChildren(self, node, game):
+        """
+        Add a child for every legal move in game to node.
+        Args:
+            node(int): node to expand
+            game(Game): the game state at node
+        """
+        index = game.topology.index
+        previous = -1
+        for move in game.get_all_legal_moves():
+            previous = self.addNode(node, index[move], previous)
+
+    def chooseChild(self, node):
+        """
+        Choose the best child of a node by UCB value. Unvisited children are
+        always chosen first.
+        Args:
+            node(int): parent node
+        Returns:
+            int: child node
+        """
+        visits = self.visits
+        wins = self.wins
+        logParent = math.log(visits[node]) if visits[node] > 0 else 0.0
+        bestValue = 0
+        child = self.firstChild[node]
+        bestNode = child
+        while child != -1:
+            n = visits[child]
+            if n == 0:
+                return child
+            ucb = wins[child]/n + self.c*math.sqrt(logParent/n)
+            if ucb > bestValue:
+                bestValue = ucb
+                bestNode = child
+            child = self.nextSibling[child]
+        return bestNode
+
+    def search(self):
+        """
+        Run the search from the root until the time limit is reached.
+        """
+        game = self.game
+        moves = game.topology.moves
+        startTime = time.time()
+        while time.time() - startTime <= self.timeLimit:
+            # Selection: go down the tree making moves in the root game until
+            # an unvisited node or the end of the game.
+            node = 0
+            depth = 0
+            while not game.is_finished():
+                if self.firstChild[node] == -1:
+                    self.makeChildren(node, game)
+                node = self.chooseChild(node)
+                game.take_turn(moves[self.move[node]])
+                depth += 1
+                if self.visits[node] == 0:
+                    break
+            # Rollout. The game itself isn't changed.
+            eval = self.policy(game) == self.index
+            # Backpropagate up the parent links.
+            while node != -1:
+                self.visits[node] += 1
+                self.wins[node] += eval
+                node = self.parent[node]
+            # Back to the root game.
+            for i in range(depth):
+                game.undo_move()
+
+    def nextMove(self):
+        """
+        Search, then choose the next best move from the root node and make that
+        child the new root.
+        Returns:
+            3-tuple(int): Move to make
+        """
+        if self.firstChild[0] == -1:
+            self.makeChildren(0, self.game)
+        self.search()
+        best = self.chooseChild(0)
+        move = self.game.topology.moves[self.move[best]]
+        self.reroot(best)
+        self.game.take_turn(move)
+        return move
+
+    def close(self):
+        """
+        Nothing to shut down. Here to match MonteCarloTree.
+        """
+        pass
@@ -5,8 +5,15 @@
 
 try:
     import BasicPlayers
+    from BitboardGame import BitboardGame
+    from MonteCarloArrayTree import ArrayMonteCarloTree
+    from Rollout import random_rollout, batch_rollout, amaf_rollout, get_policy
 except ModuleNotFoundError:
     import DotsAndBoxes.BasicPlayers as BasicPlayers
+    from DotsAndBoxes.BitboardGame import BitboardGame
+    from DotsAndBoxes.MonteCarloArrayTree import ArrayMonteCarloTree
+    from DotsAndBoxes.Rollout import random_rollout, batch_rollout, amaf_rollout, get_policy
+from concurrent.futures import ProcessPoolExecutor
 import time
 import random
 import math
@@ -16,7 +23,7 @@ class MonteCarloPlayer(BasicPlayers.RandomPlayer):
     This player implements Monte Carlo Tree Search. The search uses two supporting
     classes, Monte Carlo Tree and Monte Carlo Node.
     """
-    def __init__(self, playerIndex, colour="red", timeLimit=2, c=1.4142):
+    def __init__(self, playerIndex, colour="red", timeLimit=2, c=1.4142, workers=1, parallelMode=None, storage="objects", rolloutBatch=1, raveK=0, rolloutPolicy="random"):
         """
         Override for Monte Carlo Player.
         Args:
@@ -24,22 +31,48 @@ class MonteCarloPlayer(BasicPlayers.RandomPlayer):
             colour(str): Colour for the UI to render. Defaults to Red
             timeLimit(int/float): Time limit in seconds for moves
             c(float): Exploration parameter for MCTS
+            workers(int): Number of processes to search with.
+            parallelMode(str): "root" or "leaf". See MonteCarloTree. None
+                picks the storage's own mode, "root" for a tree and "leaf"
+                for the DAG.
+            storage(str): "objects" for a tree of MonteCarloNodes, "arrays"
+                for the more compact ArrayMonteCarloTree, or "dag" for a
+                MonteCarloDag that shares nodes between transpositions. The
+                array tree only plays single rollouts in one process without
+                RAVE, so raises ValueError if workers, parallelMode,
+                rolloutBatch or raveK are changed from their defaults. The
+                DAG has no RAVE and only searches in parallel in leaf mode,
+                so raises ValueError for raveK or a "root" parallelMode.
+            rolloutBatch(int): Rollouts played together for each leaf. See MonteCarloTree.
+            raveK(float): RAVE equivalence parameter. 0 turns RAVE off. See MonteCarloTree.
+            rolloutPolicy(str): "random" or "greedy". See MonteCarloTree.
         """
         self.index = playerIndex
         self.colour = colour
-        self.tree = MonteCarloTree(playerIndex, timeLimit, c)
+        if storage == "arrays":
+            if workers != 1 or parallelMode is not None or rolloutBatch != 1 or raveK:
+                raise ValueError("The array tree can't use workers, parallelMode, rolloutBatch or raveK")
+            self.tree = ArrayMonteCarloTree(playerIndex, timeLimit, c, rolloutPolicy)
+        elif storage == "dag":
+            if raveK:
+                raise ValueError("The DAG can't use raveK")
+            self.tree = MonteCarloDag(playerIndex, timeLimit, c, workers, parallelMode or "leaf", rolloutBatch=rolloutBatch, rolloutPolicy=rolloutPolicy)
+        else:
+            self.tree = MonteCarloTree(playerIndex, timeLimit, c, workers, parallelMode or "root", rolloutBatch=rolloutBatch, raveK=raveK, rolloutPolicy=rolloutPolicy)
 
     def chooseMove(self, game):
         """
         Monte Carlo choose move. Updates the tree with the new game state.
         Then gets the best move from tree's nextMove method.
+        The tree searches on a BitboardGame copy of the game, which is much
+        cheaper to copy and play moves in.
         Args:
             game(Game): game state to start search from.
         Returns:
             3-tuple(int): Move to make
         """
         # first we need to update the tree with the new game state
-        self.tree.update(game)
+        self.tree.update(BitboardGame.from_game(game))
         # Then get the next move to be made.
         move = self.tree.nextMove()
         if game.is_legal_move(move):
@@ -47,17 +80,64 @@ class MonteCarloPlayer(BasicPlayers.RandomPlayer):
         else:
             return self.randomMove(game)
 
+    def close(self):
+        """
+        Shut down any worker processes.
+        """
+        self.tree.close()
+
     def __str__(self):
         return "{}_monty".format(self.index)
 
 class MonteCarloTree:
-    def __init__(self, index, timeLimit=2, c=1.4142):
+    def __init__(self, index, timeLimit=2, c=1.4142, workers=1, parallelMode="root", batchSize=8, rolloutBatch=1, raveK=0, rolloutPolicy="random"):
         """
         Monte Carlo Tree class
+        With more than one worker the search runs in parallel in one of two ways.
+        "root": each worker grows its own tree from the current position and
+            the visit counts of the root moves are added together at the end.
+        "leaf": there is one tree, but every leaf reached is rolled out
+            batchSize times in each worker and all of the results backpropagated.
+        With rolloutBatch above 1 every leaf reached is rolled out that many
+        times at once with batch_rollout, and all of the results backpropagated.
+        This is most useful on big boards where rollouts are long compared to
+        going down the tree.
+        With raveK above 0 the tree also keeps All-Moves-As-First statistics:
+        every node records how well each of its moves did whenever the
+        player to move there drew that line later in a simulation, not just
+        when it was chosen there. Selection blends these in with weight
+        beta = sqrt(raveK/(3n + raveK)), which fades out as a child gets more
+        visits of its own. raveK is roughly the number of visits at which
+        the two count equally. AMAF needs the moves from each rollout, so it
+        is only used with single rollouts in one process.
+        rolloutPolicy picks how rollouts play. "random" draws any free line.
+        "greedy" completes a box whenever it can and otherwise avoids drawing
+        a box's third side unless it has to, which is closer to how the game
+        is really played. Greedy rollouts are about half as fast, and
+        batch_rollout only plays random ones, so rolloutBatch plays greedy
+        rollouts one after another.
+        Args:
+            index(int): player index in game
+            timeLimit(int/float): Time limit in seconds for moves
+            c(float): Exploration parameter
+            workers(int): Number of processes to search with
+            parallelMode(str): "root" or "leaf"
+            batchSize(int): Rollouts per worker per leaf in leaf parallel mode
+            rolloutBatch(int): Rollouts per leaf when searching in one process
+            raveK(float): RAVE equivalence parameter, 0 for plain UCT
+            rolloutPolicy(str): "random" or "greedy"
         """
         self.index = index
         self.c = c
         self.timeLimit = timeLimit
+        self.workers = workers
+        self.parallelMode = parallelMode
+        self.batchSize = batchSize
+        self.rolloutBatch = rolloutBatch
+        self.raveK = raveK
+        self.rolloutPolicy = rolloutPolicy
+        self.policy = get_policy(rolloutPolicy)
+        self.pool = None
         self.root = None
 
     def update(self, game):
@@ -78,8 +158,7 @@ class MonteCarloTree:
         Args:
             game(Game): game state to start search from.
         """
-        self.root = MonteCarloNode(self.index, game, (0,0,0), "Root", self.c)
-        self.root.makeChildren()
+        self.root = MonteCarloNode(self.index, game, (0,0,0), "Root", self.c, raveK=self.raveK)
 
     def nextMove(self):
         """
@@ -87,7 +166,46 @@ class MonteCarloTree:
         Returns:
             3-tuple(int): Move to make
         """
+        if self.workers > 1 and self.parallelMode == "root":
+            return self.nextMoveRootParallel()
         #print("Choosing move. root.n = {}".format(self.root.n))
+        self.search()
+        # pick the best child and make this the new root node.
+        #print("Chosen move. root.n = {}".format(self.root.n))
+        bestChild = self.root.chooseChild()
+        self.root = bestChild
+        self.root.makeRoot()
+        # then return that move
+        #print("New root.n = {}".format(self.root.n))
+        return self.root.move
+
+    def nextMoveRootParallel(self):
+        """
+        Root parallel version of nextMove. The other workers each search their
+        own tree while this one searches the main tree. Then the visits and
+        wins for each root move are added up, and the most visited move chosen.
+        Returns:
+            3-tuple(int): Move to make
+        """
+        pool = self.getPool()
+        futures = [pool.submit(_search_tree, self.root.game, self.index, self.timeLimit, self.c, self.rolloutBatch, self.raveK, self.rolloutPolicy) for i in range(self.workers-1)]
+        self.search()
+        stats = {child.move: [child.n, child.t] for child in self.root.children}
+        for future in futures:
+            for move, (n, t) in future.result().items():
+                moveStats = stats.setdefault(move, [0, 0])
+                moveStats[0] += n
+                moveStats[1] += t
+        bestMove = max(stats, key=lambda move: stats[move][0])
+        # The best move may only have been expanded in another worker's tree.
+        self.root = self.root.getChild(bestMove)
+        self.root.makeRoot()
+        return self.root.move
+
+    def search(self):
+        """
+        Run the search from the root node until the time limit is reached.
+        """
         current = self.root.chooseChild()
         no_iterations = 0
         startTime = time.time()
@@ -95,7 +213,7 @@ class MonteCarloTree:
         while timeTaken <= self.timeLimit:
             if current.game.is_finished() or current.n == 0:
                 # the rollout method also handles the backpropagation step.
-                current.rollout()
+                self.simulate(current)
                 # after rollout reset to root.
                 current = self.root
                 no_iterations += 1
@@ -104,14 +222,60 @@ class MonteCarloTree:
             # the next node is the best child of the current node.
             current = current.chooseChild()
             # that's it that's the algorithm
-        # pick the best child and make this the new root node.
-        #print("Chosen move. root.n = {}".format(self.root.n))
-        bestChild = self.root.chooseChild()
-        self.root = bestChild
-        self.root.parent = None
-        # then return that move
-        #print("New root.n = {}".format(self.root.n))
-        return self.root.move
+
+    def simulate(self, node):
+        """
+        Roll out a leaf node and backpropagate the result. In leaf parallel
+        mode a batch of rollouts is shared between the workers, otherwise
+        rolloutBatch rollouts are played together in this process.
+        Args:
+            node(MonteCarloNode): leaf to roll out
+        """
+        if self.workers > 1 and self.parallelMode == "leaf" or self.rolloutBatch > 1:
+            wins, visits = self.playout(node.game)
+            node.backpropagate(wins, visits)
+        elif self.raveK:
+            winner, played = amaf_rollout(node.game, policy=self.rolloutPolicy)
+            eval = winner == self.index
+            node.backpropagate(eval)
+            node.backpropagateAmaf(eval, played)
+        else:
+            node.rollout(self.policy)
+
+    def playout(self, game):
+        """
+        Play the rollouts for one leaf, in the way simulate describes.
+        Args:
+            game(Game): game state to roll out from
+        Returns:
+            2-tuple(int, int): rollouts won and rollouts played.
+        """
+        if self.workers > 1 and self.parallelMode == "leaf":
+            pool = self.getPool()
+            futures = [pool.submit(_rollouts, game, self.index, self.batchSize, self.rolloutPolicy) for i in range(self.workers)]
+            wins = sum(future.result() for future in futures)
+            return wins, self.batchSize*self.workers
+        elif self.rolloutBatch > 1:
+            return _rollouts(game, self.index, self.rolloutBatch, self.rolloutPolicy), self.rolloutBatch
+        return int(self.policy(game) == self.index), 1
+
+    def getPool(self):
+        """
+        Get the pool of worker processes, starting it if needed.
+        Returns:
+            ProcessPoolExecutor
+        """
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+        return self.pool
+
+    def close(self):
+        """
+        Shut down any worker processes.
+        """
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+            self.pool = None
 
     def newRoot(self, game):
         """
@@ -124,40 +288,41 @@ class MonteCarloTree:
         movesMade = game.movesMade[len(self.root.game.movesMade):len(game.movesMade)]
         # go through each move in order
         for move in movesMade:
-            if newRoot.children:
-                # if this node has children, find the one that corresponds to the move made
-                for child in newRoot.children:
-                    if child.move == move:
-                        # then make this the new root node
-                        newRoot = child
-                        break
+            # find the child that corresponds to the move made
+            child = newRoot.findChild(move)
+            if child is not None:
+                # then make this the new root node
+                newRoot = child
             else:
                 #print("Building new root")
-                # if the node doesn't have children then make a fresh new root node
-                newRoot = MonteCarloNode(self.index, game, (0,0,0), "NewRoot", self.c)
-                newRoot.makeChildren()
+                # if the move hasn't been expanded then make a fresh new root node
+                newRoot = MonteCarloNode(self.index, game, (0,0,0), "NewRoot", self.c, raveK=self.raveK)
                 break
 
         self.root = newRoot
-        self.root.parent = None
+        self.root.makeRoot()
 
 class MonteCarloNode:
-    def __init__(self, playerIndex, game, move, name, c=1.4142, parent=None):
+    def __init__(self, playerIndex, game, move, name, c=1.4142, parent=None, raveK=0):
         """
         Initialise a node for the Monte Carlo Tree search with a gamestate, the
         move made to reach this game state and its parent node.
+        Children are created lazily, one each time the node is chosen from,
+        and a child's game is only made when it is first needed.
         Args:
             playerIndex: Index that the Monte Carlo player has
-            game(Game): Gamestate this node represents
+            game(Game): Gamestate this node represents. None to work it out
+                from the parent's game and move when needed.
             move(3-Tuple[int]): Move made to get to this node
             name(str): debug parameter
             c(float): exploration parameter.
             parent(MonteCarloNode): Parent of this node. None for root node.
+            raveK(float): RAVE equivalence parameter. 0 selects by plain UCB.
         """
         self.playerIndex = playerIndex
         self.parent = parent
         self.move = move
-        self.game = game
+        self._game = game
         self.name = name
         self.t = 0.0
         self.n = 0.0
@@ -165,18 +330,52 @@ class MonteCarloNode:
         # sqrt(2) ~~ 1.4142
         self.c = c
         self.children = []
+        # Moves that don't have a child node yet, in reverse order so the next
+        # one can be popped off the end. None until the node is first chosen from.
+        self.untriedMoves = None
+        self.raveK = raveK
+        # All-Moves-As-First statistics for the moves from this node, as
+        # move -> [visits, wins]. Only kept when RAVE is on.
+        self.amaf = {}
+
+    @property
+    def game(self):
+        """
+        The game state for this node, made from the parent's game the first
+        time it is needed.
+        Returns:
+            Game
+        """
+        if self._game is None:
+            self._game = self.parent.makeMove(self.move)
+        return self._game
+
+    def makeRoot(self):
+        """
+        Detach this node from its parent so it can be the root of the tree.
+        Its game has to be made first as it depends on the parent.
+        """
+        self.game
+        self.parent = None
 
     def chooseChild(self):
         """
         Choose the best child node based on UCB values.
+        Untried moves are expanded first, in order, one per call. This matches
+        choosing the first unvisited child, which always has the highest UCB.
         """
-        if not self.children:
-            self.makeChildren()
+        if self.untriedMoves is None:
+            self.untriedMoves = self.game.get_all_legal_moves()
+            self.untriedMoves.reverse()
+        if self.untriedMoves:
+            if self.raveK and self.amaf:
+                return self.expand(self.bestUntriedMove())
+            return self.expand(self.untriedMoves.pop())
         bestValue = 0
         # This picks the first node by default
         bestNode = self.children[0]
         for node in self.children:
-            ucb = node.ucb()
+            ucb = node.raveValue() if self.raveK else node.ucb()
             if ucb > bestValue:
                 bestValue = ucb
                 bestNode = node
@@ -202,45 +401,154 @@ class MonteCarloNode:
         exploration =  self.c*math.sqrt(math.log(self.parent.n)/self.n)
         return exploitation + exploration
 
+    def raveValue(self):
+        """
+        UCB with the win rate blended with the parent's AMAF win rate for
+        this node's move. The AMAF weight beta = sqrt(k/(3n + k)) starts at 1
+        and falls towards 0 as this node gets visits of its own.
+        Returns:
+            float
+        """
+        if self.n == 0:
+            return 1000000
+        if self.parent is None:
+            return -1
+        exploitation = self.t/self.n
+        amafN, amafT = self.parent.amaf.get(self.move, (0, 0))
+        if amafN:
+            beta = math.sqrt(self.raveK/(3*self.n + self.raveK))
+            exploitation = (1-beta)*exploitation + beta*amafT/amafN
+        exploration = self.c*math.sqrt(math.log(self.parent.n)/self.n)
+        return exploitation + exploration
+
+    def bestUntriedMove(self):
+        """
+        Take the untried move with the best AMAF win rate out of the untried
+        moves. Moves with no AMAF statistics count as a win rate of 0.5.
+        Returns:
+            3-Tuple[int]
+        """
+        best = len(self.untriedMoves) - 1
+        bestValue = -1
+        # untriedMoves is reversed, so go from the end to keep the move
+        # order for ties.
+        for i in range(len(self.untriedMoves)-1, -1, -1):
+            amafN, amafT = self.amaf.get(self.untriedMoves[i], (0, 0))
+            value = amafT/amafN if amafN else 0.5
+            if value > bestValue:
+                bestValue = value
+                best = i
+        return self.untriedMoves.pop(best)
+
+    def backpropagateAmaf(self, eval, played, visits=1):
+        """
+        Update the AMAF statistics of this node and every node above it after
+        a simulation. At each node, every move drawn later in the simulation
+        by the player to move there counts as if it had been played first.
+        In Dots and Boxes every line gets drawn in every game, so only
+        counting the moves of the player to move is what makes this useful.
+        Args:
+            eval(Bool/int): True for win, False for not win.
+            played(dict{int: Set[3-tuple(int)]}): moves each player drew in
+                the rollout from this node. Tree moves are added on the way up.
+            visits(int): Number of rollouts the result is for.
+        """
+        node = self
+        while node is not None:
+            mover = node.game.currentPlayer
+            for move in played.get(mover, ()):
+                stats = node.amaf.get(move)
+                if stats is None:
+                    node.amaf[move] = [visits, eval]
+                else:
+                    stats[0] += visits
+                    stats[1] += eval
+            if node.parent is not None:
+                # The move into this node was made by the player to move
+                # at the parent, after every node further up.
+                played.setdefault(node.parent.game.currentPlayer, set()).add(node.move)
+            node = node.parent
+
+    def expand(self, move):
+        """
+        Create a child node for a move. The child's game is not made yet.
+        Args:
+            move(3-Tuple[int]): Move the child represents
+        Returns:
+            MonteCarloNode
+        """
+        newName = self.name+"-"+str(len(self.children))
+        # Make new node with player index, no game state yet, move made, new name and parent.
+        child = MonteCarloNode(self.playerIndex, None, move, newName, self.c, self, self.raveK)
+        self.children.append(child)
+        return child
+
     def makeChildren(self):
         """
-        Create child nodes for this node. Each move that can be made will spawn
-        a new child node.
+        Create child nodes for every move that hasn't been expanded yet.
         """
-        moves = self.game.get_all_legal_moves()
-        for i, m in enumerate(moves):
-            newName = self.name+"-"+str(i)
-            # Make new node with player index, new game state, move made, new name and parent.
-            self.children.append(MonteCarloNode(self.playerIndex, self.makeMove(m), m, newName, self.c, self))
-        #self.children = [MonteCarloNode(self.playerIndex, self.makeMove(m), m, self) for m in moves]
+        if self.untriedMoves is None:
+            self.untriedMoves = self.game.get_all_legal_moves()
+            self.untriedMoves.reverse()
+        while self.untriedMoves:
+            self.expand(self.untriedMoves.pop())
 
-    def rollout(self):
+    def findChild(self, move):
         """
-        Rollout will take the state and play random moves until the game is finished.
+        Find the child node for a move, if it has been expanded.
+        Args:
+            move(3-Tuple[int]): Move to look for
+        Returns:
+            MonteCarloNode or None
+        """
+        for child in self.children:
+            if child.move == move:
+                return child
+        return None
+
+    def getChild(self, move):
+        """
+        Get the child node for a move, expanding it if needed.
+        Args:
+            move(3-Tuple[int]): Move to look for
+        Returns:
+            MonteCarloNode
+        """
+        child = self.findChild(move)
+        if child is None:
+            if self.untriedMoves is None:
+                self.untriedMoves = self.game.get_all_legal_moves()
+                self.untriedMoves.reverse()
+            self.untriedMoves.remove(move)
+            child = self.expand(move)
+        return child
+
+    def rollout(self, policy=random_rollout):
+        """
+        Rollout will take the state and play moves until the game is finished.
         The end state will then be evaluated and backpropagated.
+        Args:
+            policy(function): rollout policy from Rollout, random by default
         """
-        copyGame = self.game.get_copy()
-        moves = copyGame.get_all_legal_moves()
-        random.shuffle(moves)
-        for move in moves:
-            copyGame.take_turn(move)
         # 1 + True = 2. 1 + False = 1
-        eval = (copyGame.winner() == self.playerIndex)
+        eval = (policy(self.game) == self.playerIndex)
         # we then call our own backpropagate method to send the values up the tree
         self.backpropagate(eval)
 
-    def backpropagate(self, eval):
+    def backpropagate(self, eval, visits=1):
         """
         Backpropagate method to send values all the way back to the root of the tree.
         Also recalculate ucb for each node on the way.
         Args:
-            eval(Bool): True for win, False for not win.
+            eval(Bool/int): True for win, False for not win. The number of wins
+                when backpropagating more than one rollout.
+            visits(int): Number of rollouts the result is for.
         """
-        self.n += 1
+        self.n += visits
         # t + True = t+1, t + False = t
         self.t += eval
         if self.parent is not None:
-            self.parent.backpropagate(eval)
+            self.parent.backpropagate(eval, visits)
 
     def makeMove(self, move):
         """
@@ -272,3 +580,266 @@ class MonteCarloNode:
         else:
             childStr = "  Node has no children.\n"
         return returnStr + childStr
+
+class MonteCarloDag(MonteCarloTree):
+    """
+    Monte Carlo search where transpositions share a node. In Dots and Boxes
+    most moves can be played in either order, so many paths through the tree
+    reach the same position. Here every node is kept in a dict keyed by its
+    position, and a move that reaches a known position links to the existing
+    node, so the rollouts from all of those paths are pooled.
+    UCT is adapted for the DAG by keeping visit counts on the edges as well
+    as the nodes. A child's win rate comes from its node, which counts
+    rollouts from every path to it. The exploration term uses the edge
+    count, which only counts visits made through this parent.
+    Results are backpropagated along the path that was walked, as a node can
+    have several parents.
+    Searches in one process, or in leaf parallel mode.
+    """
+    def __init__(self, index, timeLimit=2, c=1.4142, workers=1, parallelMode="leaf", batchSize=8, rolloutBatch=1, rolloutPolicy="random"):
+        """
+        Args are the same as MonteCarloTree, but root parallel search isn't
+        supported, so parallelMode must be "leaf" and workers are used for
+        leaf parallel search. Raises ValueError for any other parallelMode.
+        """
+        if parallelMode != "leaf":
+            raise ValueError("The DAG only searches in leaf parallel mode")
+        super().__init__(index, timeLimit, c, workers, parallelMode, batchSize, rolloutBatch, rolloutPolicy=rolloutPolicy)
+        # Position key -> MonteCarloDagNode
+        self.nodes = {}
+
+    @staticmethod
+    def positionKey(game):
+        """
+        Key for a position. The Zobrist hash covers the lines drawn and the
+        player to move, but not who owns the boxes, so the score difference
+        is added to it. Who owns which box makes no difference to the rest
+        of the game.
+        Args:
+            game(Game): game state
+        Returns:
+            2-tuple(int, int)
+        """
+        return game.hash, game.check_score(1) - game.check_score(2)
+
+    def startTree(self, game):
+        """
+        Start a new DAG from a game state.
+        Args:
+            game(Game): game state to start search from.
+        """
+        key = self.positionKey(game)
+        self.root = MonteCarloDagNode(key, game)
+        self.nodes = {key: self.root}
+
+    def newRoot(self, game):
+        """
+        Find the node for a new game state and make it the root, dropping
+        every node that can no longer be reached. If the position isn't in
+        the DAG a new one is started.
+        Args:
+            game(Game): Gamestate to search for
+        """
+        root = self.nodes.get(self.positionKey(game))
+        if root is None:
+            self.startTree(game)
+            return
+        root.game
+        self.root = root
+        # Keep only what can be reached from the new root.
+        self.nodes = {}
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            if node.key in self.nodes:
+                continue
+            self.nodes[node.key] = node
+            stack.extend(node.childNodes)
+
+    def nextMove(self):
+        """
+        Search, then choose the move along the most visited edge from the
+        root. The child becomes the new root.
+        Returns:
+            3-tuple(int): Move to make
+        """
+        self.search()
+        if not self.root.childMoves:
+            self.root.makeChildren(self)
+        best = max(range(len(self.root.childMoves)), key=lambda i: self.root.edgeVisits[i])
+        move = self.root.childMoves[best]
+        child = self.root.childNodes[best]
+        child.game
+        self.root = child
+        self.newRoot(child.game)
+        return move
+
+    def search(self):
+        """
+        Run the search from the root node until the time limit is reached.
+        Each iteration walks down from the root until it reaches a node with
+        no rollouts or the end of the game, rolls out from there and updates
+        every node and edge on the path.
+        """
+        startTime = time.time()
+        while time.time() - startTime <= self.timeLimit:
+            node = self.root
+            path = []
+            while node.n > 0 and not node.game.is_finished():
+                i = node.chooseEdge(self)
+                path.append((node, i))
+                node = node.childNodes[i]
+            wins, visits = self.playout(node.game)
+            node.n += visits
+            node.t += wins
+            for parent, i in path:
+                parent.n += visits
+                parent.t += wins
+                parent.edgeVisits[i] += visits
+
+class MonteCarloDagNode:
+    """
+    Node of a MonteCarloDag. Edges to the children are kept in three parallel
+    lists: the move, the child node and the number of visits along the edge.
+    """
+    def __init__(self, key, game, parent=None, move=None):
+        """
+        Args:
+            key(2-tuple(int, int)): this node's key in MonteCarloDag.nodes
+            game(Game): Gamestate this node represents. None to work it out
+                from parent and move when needed.
+            parent(MonteCarloDagNode): any node with an edge to this one.
+            move(3-Tuple[int]): Move from parent to this node
+        """
+        self.key = key
+        self._game = game
+        self.parent = parent
+        self.move = move
+        self.t = 0.0
+        self.n = 0.0
+        self.childMoves = []
+        self.childNodes = []
+        self.edgeVisits = []
+        self.untriedMoves = None
+
+    @property
+    def game(self):
+        """
+        The game state for this node, made from the parent's game the first
+        time it is needed. The parent isn't needed after that.
+        Returns:
+            Game
+        """
+        if self._game is None:
+            self._game = self.parent.game.get_copy()
+            self._game.take_turn(self.move)
+            self.parent = None
+        return self._game
+
+    def expand(self, dag, move):
+        """
+        Add an edge for a move, linking to the existing node if the position
+        it reaches is already in the DAG.
+        The move is made and undone in this node's game to find the key, so
+        no game is copied unless a new node is made and searched.
+        Args:
+            dag(MonteCarloDag): the DAG this node belongs to
+            move(3-Tuple[int]): Move to add
+        Returns:
+            int: index of the new edge
+        """
+        game = self.game
+        game.take_turn(move)
+        key = dag.positionKey(game)
+        game.undo_move()
+        child = dag.nodes.get(key)
+        if child is None:
+            child = MonteCarloDagNode(key, None, self, move)
+            dag.nodes[key] = child
+        self.childMoves.append(move)
+        self.childNodes.append(child)
+        self.edgeVisits.append(0)
+        return len(self.childMoves) - 1
+
+    def makeChildren(self, dag):
+        """
+        Add edges for every move that hasn't been expanded yet.
+        Args:
+            dag(MonteCarloDag): the DAG this node belongs to
+        """
+        if self.untriedMoves is None:
+            self.untriedMoves = self.game.get_all_legal_moves()
+            self.untriedMoves.reverse()
+        while self.untriedMoves:
+            self.expand(dag, self.untriedMoves.pop())
+
+    def chooseEdge(self, dag):
+        """
+        Choose which edge to follow. Untried moves are expanded first, in
+        order, then edges are chosen by UCB using the child's pooled win rate
+        and this edge's visit count.
+        Args:
+            dag(MonteCarloDag): the DAG this node belongs to
+        Returns:
+            int: index of the edge
+        """
+        if self.untriedMoves is None:
+            self.untriedMoves = self.game.get_all_legal_moves()
+            self.untriedMoves.reverse()
+        if self.untriedMoves:
+            return self.expand(dag, self.untriedMoves.pop())
+        logN = math.log(self.n)
+        bestValue = -1
+        best = 0
+        for i, child in enumerate(self.childNodes):
+            visits = self.edgeVisits[i]
+            if visits == 0:
+                return i
+            value = child.t/child.n + dag.c*math.sqrt(logN/visits)
+            if value > bestValue:
+                bestValue = value
+                best = i
+        return best
+
+def _init_worker():
+    """
+    Give each worker process its own random sequence. Forked workers would
+    otherwise all play the same rollouts.
+    """
+    random.seed()
+
+def _search_tree(game, index, timeLimit, c, rolloutBatch=1, raveK=0, rolloutPolicy="random"):
+    """
+    Grow a separate tree from game in a worker process, for root parallel search.
+    Args:
+        game(Game): game state to search from
+        index(int): player index
+        timeLimit(int/float): Time limit in seconds
+        c(float): Exploration parameter
+        rolloutBatch(int): Rollouts per leaf
+        raveK(float): RAVE equivalence parameter
+        rolloutPolicy(str): rollout policy name
+    Returns:
+        dict{3-tuple(int): 2-tuple(float)}: visits and wins for each root move.
+    """
+    tree = MonteCarloTree(index, timeLimit, c, rolloutBatch=rolloutBatch, raveK=raveK, rolloutPolicy=rolloutPolicy)
+    tree.startTree(game)
+    tree.search()
+    return {child.move: (child.n, child.t) for child in tree.root.children}
+
+def _rollouts(game, index, count, rolloutPolicy="random"):
+    """
+    Play a number of rollouts from game, for leaf parallel search and rollout
+    batches. Random rollouts are played together with batch_rollout.
+    Args:
+        game(Game): game state to roll out from
+        index(int): player index
+        count(int): number of rollouts
+        rolloutPolicy(str): rollout policy name
+    Returns:
+        int: number of rollouts won by player index
+    """
+    if rolloutPolicy == "random":
+        return sum(1 for winner in batch_rollout(game, count) if winner == index)
+    policy = get_policy(rolloutPolicy)
+    return sum(1 for i in range(count) if policy(game) == index)
@@ -0,0 +1,89 @@
+import random
+
+class MoveSet:
+    """
+    Set of moves that can also pick a random member in constant time.
+    Moves are kept in a list along with a dict from each move to its position
+    in the list. Removing a move swaps the last move into its place, so adding,
+    removing and checking for a move are all O(1).
+    The order of the list changes as moves are removed, so anything that needs
+    a fixed order should sort the moves.
+    """
+    __slots__ = ("moves", "positions")
+
+    def __init__(self, moves=()):
+        """
+        Args:
+            moves(Iterable[3-tuple(int)]): starting moves
+        """
+        self.moves = []
+        self.positions = {}
+        for move in moves:
+            self.add(move)
+
+    def add(self, move):
+        """
+        Add a move if it isn't already in the set.
+        Args:
+            move(3-tuple(int))
+        """
+        if move not in self.positions:
+            self.positions[move] = len(self.moves)
+            self.moves.append(move)
+
+    def remove(self, move):
+        """
+        Remove a move by swapping the last move into its place.
+        Raises KeyError if the move isn't in the set.
+        Args:
+            move(3-tuple(int))
+        """
+        index = self.positions.pop(move)
+        last = self.moves.pop()
+        if last != move:
+            self.moves[index] = last
+            self.positions[last] = index
+
+    def random_choice(self, rng=random):
+        """
+        Pick a random move.
+        Args:
+            rng(random.Random): source of randomness
+        Returns:
+            3-tuple(int)
+        """
+        return self.moves[rng.randrange(len(self.moves))]
+
+    def copy(self):
+        """
+        Returns:
+            MoveSet: a copy that can be changed separately.
+        """
+        new = MoveSet.__new__(MoveSet)
+        new.moves = self.moves.copy()
+        new.positions = self.positions.copy()
+        return new
+
+    def __contains__(self, move):
+        try:
+            return move in self.positions
+        except TypeError:
+            # Unhashable input can never be a move.
+            return False
+
+    def __iter__(self):
+        return iter(self.moves)
+
+    def __len__(self):
+        return len(self.moves)
+
+    def __eq__(self, other):
+        """
+        Two sets are equal if they hold the same moves, in any order.
+        """
+        if isinstance(other, MoveSet):
+            return self.positions.keys() == other.positions.keys()
+        return NotImplemented
+
+    def __repr__(self):
+        return "MoveSet({})".format(sorted(self.moves))
@@ -17,7 +17,7 @@ class PlayerFactory:
     def __init__(self):
         self.playerTypes = ["Human Player", "Random Player", "Ordered Player", "Minimax Player", "Monte Carlo Player"]
 
-    def makePlayer(self, playerType, index, colour="red", timeLimit=None, maxDepth=20, c=1.4):
+    def makePlayer(self, playerType, index, colour="red", timeLimit=None, maxDepth=20, c=1.4, workers=1, parallelMode=None, storage="objects", rolloutBatch=1, raveK=0, rolloutPolicy="random", ttMemory=16):
         """
         Factory method for returning correct player type.
         If for some reason playerType isn't in the internal list, just return a
@@ -29,6 +29,13 @@ class PlayerFactory:
             timeLimit(int) - 1: Time limit for the complex AI players.
             maxDepth(int) - 20: Max depth that Minimax player can reach.
             c(float) - 1.4: Exploration parameter for Monte Carlo player.
+            workers(int) - 1: Number of processes the complex AI players search with.
+            parallelMode(str) - None: How Monte Carlo player uses its workers, "root" or "leaf". None picks the storage's own mode.
+            storage(str) - 'objects': How Monte Carlo player stores its tree, "objects", "arrays" or "dag".
+            rolloutBatch(int) - 1: Rollouts Monte Carlo player plays together for each leaf.
+            raveK(float) - 0: RAVE equivalence parameter for Monte Carlo player. 0 turns RAVE off.
+            rolloutPolicy(str) - 'random': How Monte Carlo player plays rollouts, "random" or "greedy".
+            ttMemory(int/float) - 16: Megabytes for Minimax player's transposition table.
         Returns:
             Player - One of the player types.
         """
@@ -42,11 +49,11 @@ class PlayerFactory:
             if timeLimit is None:
                 # switch so that different players have different default time limits.
                 timeLimit = 5
-            return MinimaxPlayer(index, colour, timeLimit, maxDepth)
+            return MinimaxPlayer(index, colour, timeLimit, maxDepth, ttMemory, workers=workers)
         elif playerType == "Monte Carlo Player":
             if timeLimit is None:
                 # switch so that different players have different default time limits.
                 timeLimit = 5
-            return MonteCarloPlayer(index, colour, timeLimit, c)
+            return MonteCarloPlayer(index, colour, timeLimit, c, workers, parallelMode, storage, rolloutBatch=rolloutBatch, raveK=raveK, rolloutPolicy=rolloutPolicy)
         else:
             return HumanPlayer(index, colour)
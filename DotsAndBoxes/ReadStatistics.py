@@ -1,3 +1,7 @@
+try:
+    import GameRecord
+except ModuleNotFoundError:
+    import DotsAndBoxes.GameRecord as GameRecord
 import re
 import os
 
@@ -49,6 +53,18 @@ def count_winners(games):
             p2wins += 1
         else:
             draws += 1
+    print_winners(names, p1wins, p2wins, draws)
+    return [p1wins, p2wins, draws]
+
+def print_winners(names, p1wins, p2wins, draws):
+    """
+    Prints the number of wins each player got, and their win rates.
+    Args:
+        names(List[str]): names of player one and player two
+        p1wins(int)
+        p2wins(int)
+        draws(int)
+    """
     if p1wins == 1:
         p1s = ""
     else:
@@ -69,9 +85,60 @@ def count_winners(games):
     if p1wins+p2wins+draws > 0:
         print("{} player winrate: {}%".format(names[0], 100*p1wins/(p1wins+p2wins+draws)))
         print("{} player winrate: {}%".format(names[1], 100*p2wins/(p1wins+p2wins+draws)))
-    return [p1wins, p2wins, draws]
+
+def is_record_file(filename):
+    """
+    Checks if a results file holds binary game records rather than text.
+    Args:
+        filename(str)
+    Returns:
+        bool
+    """
+    with open(filename, "rb") as infile:
+        return infile.read(len(GameRecord.MAGIC)) == GameRecord.MAGIC
+
+def read_records(filename):
+    """
+    Reads the games in a binary results file one at a time, so files of any
+    size can be read without loading them all at once.
+    Args:
+        filename(str): file written by Game.save_record
+    Yields:
+        dict: with width, height, variant, players, seed, blocked, moves and
+            scores. See GameRecord.decode_record.
+    """
+    with open(filename, "rb") as infile:
+        record = GameRecord.decode_record(infile)
+        while record is not None:
+            yield record
+            record = GameRecord.decode_record(infile)
+
+def count_record_winners(filename):
+    """
+    Prints the number of wins each player got in a binary results file.
+    Args:
+        filename(str)
+    Returns:
+        List[int]: [p1wins, p2wins, draws]
+    """
+    counts = [0, 0, 0]
+    names = ["Player one", "Player two"]
+    for record in read_records(filename):
+        names = record["players"]
+        p1score, p2score = record["scores"]
+        if p1score > p2score:
+            counts[0] += 1
+        elif p2score > p1score:
+            counts[1] += 1
+        else:
+            counts[2] += 1
+    print_winners(names, *counts)
+    return counts
 
 def get_scores(filename):
+    if is_record_file(filename):
+        count_record_winners(filename)
+        return
     games = get_games(filename)
     count_winners(games)
 
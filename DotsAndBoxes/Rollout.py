@@ -0,0 +1,292 @@
+try:
+    from Topology import get_topology
+except ModuleNotFoundError:
+    from DotsAndBoxes.Topology import get_topology
+from functools import lru_cache
+import random
+try:
+    import numpy as np
+except ModuleNotFoundError:
+    # Batched rollouts fall back to running the scalar kernel in a loop.
+    np = None
+
+def rollout_state(game):
+    """
+    Read the parts of a game a rollout needs into flat lists.
+    Args:
+        game(Game/BitboardGame): game state to roll out from
+    Returns:
+        3-tuple(List[int], List[int], int): sides drawn for each box by box
+            index, undrawn edge indices, and player 1's score minus player 2's.
+    """
+    topology = game.topology
+    edges = game.get_edge_mask()
+    sides = [bin(edges & mask).count("1") for mask in topology.boxMasks]
+    free = [e for e in range(topology.noEdges) if not edges >> e & 1]
+    scores = game.get_scores()
+    return sides, free, scores[1] - scores[2]
+
+def play_out(edgeBoxes, sides, free, margin, player, rng=random, movers=None):
+    """
+    Play random moves until every edge is drawn. Only the sides count of each
+    box is tracked, so a move is a couple of list updates.
+    sides and free are changed in place.
+    Args:
+        edgeBoxes(Tuple[Tuple[int]]): boxes next to each edge, from BoardTopology
+        sides(List[int]): sides drawn for each box
+        free(List[int]): undrawn edge indices
+        margin(int): player 1's score minus player 2's so far
+        player(int): player to move, 1 or 2
+        rng(random.Random): source of randomness for the move order
+        movers(List[2-tuple(int)]): if given, (edge, player) is appended to it
+            for each edge drawn.
+    Returns:
+        int: the winner, 1 or 2, or 0 for a draw.
+    """
+    rng.shuffle(free)
+    record = movers is not None
+    # +1 while player 1 is moving, -1 for player 2.
+    sign = 1 if player == 1 else -1
+    for e in free:
+        if record:
+            movers.append((e, 1 if sign == 1 else 2))
+        captured = False
+        for b in edgeBoxes[e]:
+            sides[b] += 1
+            if sides[b] == 4:
+                margin += sign
+                captured = True
+        if not captured:
+            sign = -sign
+    if margin > 0:
+        return 1
+    if margin < 0:
+        return 2
+    return 0
+
+def random_rollout(game, rng=random):
+    """
+    Play a random game to the end from a game state, without changing it.
+    Gives the same results as shuffling the legal moves and playing them with
+    take_turn, but without touching any Line or Box objects.
+    Args:
+        game(Game/BitboardGame): game state to roll out from
+        rng(random.Random): source of randomness for the move order
+    Returns:
+        int: the winner, 1 or 2, or 0 for a draw.
+    """
+    sides, free, margin = rollout_state(game)
+    return play_out(game.topology.edgeBoxes, sides, free, margin, game.currentPlayer, rng)
+
+def greedy_play_out(topology, sides, free, margin, player, rng=random, movers=None):
+    """
+    Play a game out with a simple policy: complete a box whenever possible,
+    otherwise draw a random line that doesn't give a box its third side, and
+    only give one away when every line does.
+    Lines are kept in three pools so each move is O(1): captures (the last
+    line of a box with three sides), safe lines (no box next to them has two
+    sides yet) and every free line. A box only gains sides, so lines only
+    ever leave the safe pool. Pools are swap-remove lists with a position
+    table, like MoveSet.
+    sides and free are changed in place.
+    Args:
+        topology(BoardTopology): board geometry
+        sides(List[int]): sides drawn for each box
+        free(List[int]): undrawn edge indices
+        margin(int): player 1's score minus player 2's so far
+        player(int): player to move, 1 or 2
+        rng(random.Random): source of randomness
+        movers(List[2-tuple(int)]): if given, (edge, player) is appended to it
+            for each edge drawn.
+    Returns:
+        int: the winner, 1 or 2, or 0 for a draw.
+    """
+    edgeBoxes = topology.edgeBoxes
+    boxEdges = topology.boxEdges
+    record = movers is not None
+    # Position of each edge in free and safe, -1 when it isn't in the list.
+    freePos = [-1] * topology.noEdges
+    for i, e in enumerate(free):
+        freePos[e] = i
+    safe = []
+    safePos = [-1] * topology.noEdges
+    captures = []
+    for e in free:
+        if all(sides[b] < 2 for b in edgeBoxes[e]):
+            safePos[e] = len(safe)
+            safe.append(e)
+        elif any(sides[b] == 3 for b in edgeBoxes[e]):
+            captures.append(e)
+    sign = 1 if player == 1 else -1
+    while free:
+        # Captures can go stale when their line was drawn as another capture.
+        e = -1
+        while captures:
+            e = captures.pop()
+            if freePos[e] >= 0:
+                break
+            e = -1
+        if e < 0:
+            pool = safe if safe else free
+            e = pool[rng.randrange(len(pool))]
+        if record:
+            movers.append((e, 1 if sign == 1 else 2))
+        # Swap remove e from free, and from safe if it is there.
+        i = freePos[e]
+        last = free.pop()
+        if last != e:
+            free[i] = last
+            freePos[last] = i
+        freePos[e] = -1
+        i = safePos[e]
+        if i >= 0:
+            last = safe.pop()
+            if last != e:
+                safe[i] = last
+                safePos[last] = i
+            safePos[e] = -1
+        captured = False
+        for b in edgeBoxes[e]:
+            sides[b] += 1
+            count = sides[b]
+            if count == 4:
+                margin += sign
+                captured = True
+            elif count == 2:
+                # Every other line of this box would now give a third side.
+                for other in boxEdges[b]:
+                    i = safePos[other]
+                    if i >= 0:
+                        last = safe.pop()
+                        if last != other:
+                            safe[i] = last
+                            safePos[last] = i
+                        safePos[other] = -1
+            elif count == 3:
+                for other in boxEdges[b]:
+                    if freePos[other] >= 0:
+                        captures.append(other)
+        if not captured:
+            sign = -sign
+    if margin > 0:
+        return 1
+    if margin < 0:
+        return 2
+    return 0
+
+def greedy_rollout(game, rng=random):
+    """
+    Play a game to the end from a game state with greedy_play_out, without
+    changing it.
+    Args:
+        game(Game/BitboardGame): game state to roll out from
+        rng(random.Random): source of randomness
+    Returns:
+        int: the winner, 1 or 2, or 0 for a draw.
+    """
+    sides, free, margin = rollout_state(game)
+    return greedy_play_out(game.topology, sides, free, margin, game.currentPlayer, rng)
+
+# Rollout policies by name, for MonteCarloPlayer.
+POLICIES = {"random": random_rollout, "greedy": greedy_rollout}
+
+def get_policy(policy):
+    """
+    Look up a rollout policy.
+    Args:
+        policy(str/function): a name from POLICIES, or a function that takes a
+            game and returns the winner of a playout from it.
+    Returns:
+        function
+    """
+    if callable(policy):
+        return policy
+    if policy not in POLICIES:
+        raise ValueError("Unknown rollout policy {}".format(policy))
+    return POLICIES[policy]
+
+def amaf_rollout(game, rng=random, policy="random"):
+    """
+    Rollout that also reports which moves each player made, for
+    All-Moves-As-First statistics.
+    Args:
+        game(Game/BitboardGame): game state to roll out from
+        rng(random.Random): source of randomness for the move order
+        policy(str/function): "random" or "greedy", or either rollout
+            function. Other policies can't report their moves, so raise
+            ValueError.
+    Returns:
+        2-tuple(int, dict{int: Set[3-tuple(int)]}): the winner, 1 or 2, or 0
+            for a draw, and the set of moves drawn by players 1 and 2.
+    """
+    policy = get_policy(policy)
+    if policy is not random_rollout and policy is not greedy_rollout:
+        raise ValueError("AMAF rollouts can't be played with {}".format(policy))
+    sides, free, margin = rollout_state(game)
+    movers = []
+    if policy is greedy_rollout:
+        winner = greedy_play_out(game.topology, sides, free, margin, game.currentPlayer, rng, movers)
+    else:
+        winner = play_out(game.topology.edgeBoxes, sides, free, margin, game.currentPlayer, rng, movers)
+    moves = game.topology.moves
+    played = {1: set(), 2: set()}
+    for e, player in movers:
+        played[player].add(moves[e])
+    return winner, played
+
+@lru_cache(maxsize=None)
+def _edge_box_table(width, height):
+    """
+    Edge to box table as an array for batch_rollout. Every edge gets two
+    boxes, with edges on the border of the board pointing their second box
+    at an extra dummy box numbered noBoxes.
+    Args:
+        width(int)
+        height(int)
+    Returns:
+        numpy.ndarray: (noEdges, 2) array of box indices
+    """
+    topology = get_topology(width, height)
+    return np.array([boxes + (topology.noBoxes,)*(2-len(boxes)) for boxes in topology.edgeBoxes], dtype=np.intp)
+
+def batch_rollout(game, count, rng=None):
+    """
+    Play count random games to the end from the same game state at once.
+    Each move of the playouts is a handful of NumPy operations over all of
+    them, rather than count separate moves in Python. Needs NumPy, otherwise
+    random_rollout is run count times.
+    Args:
+        game(Game/BitboardGame): game state to roll out from
+        count(int): number of playouts
+        rng(numpy.random.Generator): source of randomness. A new generator is
+            made if this is None.
+    Returns:
+        numpy.ndarray/List[int]: the winner of each playout, 1 or 2, or 0 for a draw.
+    """
+    if np is None:
+        return [random_rollout(game) for i in range(count)]
+    if rng is None:
+        rng = np.random.default_rng()
+    sides, free, margin = rollout_state(game)
+    table = _edge_box_table(game.width, game.height)
+    rows = np.arange(count)
+    # sides drawn for every box in every playout. The dummy box starts too
+    # low to ever reach 4 sides.
+    boxSides = np.empty((count, len(sides)+1), dtype=np.int32)
+    boxSides[:, :-1] = sides
+    boxSides[:, -1] = -2*len(free) - 4
+    # A random order of the free edges for each playout.
+    order = np.array(free, dtype=np.intp)[np.argsort(rng.random((count, len(free))), axis=1)]
+    margins = np.full(count, margin, dtype=np.int32)
+    signs = np.full(count, 1 if game.currentPlayer == 1 else -1, dtype=np.int32)
+    for t in range(len(free)):
+        boxes = table[order[:, t]]
+        first = boxes[:, 0]
+        second = boxes[:, 1]
+        boxSides[rows, first] += 1
+        boxSides[rows, second] += 1
+        captured = (boxSides[rows, first] == 4).astype(np.int32) + (boxSides[rows, second] == 4)
+        margins += signs*captured
+        # The player changes in every playout that didn't capture a box.
+        signs = np.where(captured > 0, signs, -signs)
+    return np.where(margins > 0, 1, np.where(margins < 0, 2, 0))
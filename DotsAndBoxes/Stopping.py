@@ -0,0 +1,116 @@
+import math
+
+def player_one_score(counts):
+    """
+    Player one's score from a matchup's results, counting draws as half a win.
+    Args:
+        counts(List[int]): [p1wins, p2wins, draws]
+    Returns:
+        2-tuple(float, int): score and number of games
+    """
+    p1wins, p2wins, draws = counts
+    return p1wins + draws/2, p1wins + p2wins + draws
+
+def wilson_interval(score, n, z=1.96):
+    """
+    Wilson score interval for a win rate.
+    Args:
+        score(float): games won, draws counting as half
+        n(int): games played
+        z(float): normal quantile, 1.96 for 95%
+    Returns:
+        2-tuple(float): lowest and highest likely win rate
+    """
+    if n == 0:
+        return 0.0, 1.0
+    p = score/n
+    centre = (p + z*z/(2*n)) / (1 + z*z/n)
+    spread = z*math.sqrt(p*(1-p)/n + z*z/(4*n*n)) / (1 + z*z/n)
+    return max(0.0, centre-spread), min(1.0, centre+spread)
+
+class SPRT:
+    """
+    Sequential probability ratio test on player one's win rate p. It weighs
+    H0: p = p0 against H1: p = p1 after every game, and stops as soon as
+    the log likelihood ratio leaves the bounds set by alpha and beta. With
+    p0 below a half and p1 above it, stopping says which player is stronger.
+    Draws count as half a win and half a loss.
+    Matchups where the players are close to even can take a long time to
+    decide, so the tournament's number of games is still the most played.
+    """
+    def __init__(self, p0=0.45, p1=0.55, alpha=0.05, beta=0.05, minGames=10):
+        """
+        Args:
+            p0(float): win rate under H0
+            p1(float): win rate under H1
+            alpha(float): chance of accepting H1 when H0 is true
+            beta(float): chance of accepting H0 when H1 is true
+            minGames(int): games to play before stopping
+        """
+        if not 0 < p0 < p1 < 1:
+            raise ValueError("Need 0 < p0 < p1 < 1")
+        self.p0 = p0
+        self.p1 = p1
+        self.minGames = minGames
+        self.lower = math.log(beta/(1-alpha))
+        self.upper = math.log((1-beta)/alpha)
+        self.winWeight = math.log(p1/p0)
+        self.lossWeight = math.log((1-p1)/(1-p0))
+
+    def llr(self, counts):
+        """
+        Log likelihood ratio of H1 against H0.
+        Args:
+            counts(List[int]): [p1wins, p2wins, draws]
+        Returns:
+            float
+        """
+        score, n = player_one_score(counts)
+        return score*self.winWeight + (n-score)*self.lossWeight
+
+    def check(self, counts):
+        """
+        Args:
+            counts(List[int]): [p1wins, p2wins, draws]
+        Returns:
+            str: why to stop, or None to keep playing.
+        """
+        if sum(counts) < self.minGames:
+            return None
+        llr = self.llr(counts)
+        if llr >= self.upper:
+            return "SPRT accepted p >= {} (LLR {:.2f} >= {:.2f})".format(self.p1, llr, self.upper)
+        if llr <= self.lower:
+            return "SPRT accepted p <= {} (LLR {:.2f} <= {:.2f})".format(self.p0, llr, self.lower)
+        return None
+
+class WilsonWidth:
+    """
+    Stops once the Wilson interval for player one's win rate is narrower than
+    a target width, so the win rate is known well enough.
+    """
+    def __init__(self, width=0.1, z=1.96, minGames=10):
+        """
+        Args:
+            width(float): interval width to stop at
+            z(float): normal quantile, 1.96 for 95%
+            minGames(int): games to play before stopping
+        """
+        self.width = width
+        self.z = z
+        self.minGames = minGames
+
+    def check(self, counts):
+        """
+        Args:
+            counts(List[int]): [p1wins, p2wins, draws]
+        Returns:
+            str: why to stop, or None to keep playing.
+        """
+        score, n = player_one_score(counts)
+        if n < self.minGames:
+            return None
+        low, high = wilson_interval(score, n, self.z)
+        if high - low <= self.width:
+            return "Wilson interval [{:.3f}, {:.3f}] narrower than {}".format(low, high, self.width)
+        return None
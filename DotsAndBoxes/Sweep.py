@@ -0,0 +1,189 @@
+try:
+    from Tournament import Tournament, result_key
+    from Stopping import wilson_interval
+except ModuleNotFoundError:
+    from DotsAndBoxes.Tournament import Tournament, result_key
+    from DotsAndBoxes.Stopping import wilson_interval
+import itertools
+import math
+import os
+
+class Sweep:
+    """
+    Tunes a player's options by playing every combination of values from a
+    grid against a fixed opponent, with the games spread over a pool of
+    workers by Tournament. Each value plays half of its games as player one
+    and half as player two.
+    With minGames set, values are compared by successive halving: every
+    value still in plays up to minGames games, then only the best 1/eta of
+    them go on to play up to eta times as many, and so on up to games. Clearly
+    bad values are dropped after a few games, and most of the games go to
+    the values worth telling apart.
+    Each round is a Tournament sharing one results folder, so a sweep that
+    is stopped part way can be resumed, and later rounds carry on from the
+    games already played. A summary table is written to summary.txt.
+    """
+    def __init__(self, playerType, grid, opponent="Random Player", options=None, boardSizes=[(3, 3)], games=100, minGames=None, eta=3, workers=None, resultsDir=os.path.join("Results", "sweep"), seed=0, verbose=True, recordFormat="text"):
+        """
+        Args:
+            playerType(str): player type from PlayerFactory to tune
+            grid(dict{str: List}): values to try for each makePlayer option,
+                such as {"c": [1.0, 1.4], "rolloutPolicy": ["random", "greedy"]}
+            opponent(str/2-tuple(str, dict)): player as given to Tournament
+            options(dict): makePlayer options used for every value
+            boardSizes(List[2-tuple(int)]): (width, height) of each board to play on
+            games(int): most games for each value on each board
+            minGames(int): games in the first round of successive halving.
+                None plays every value games times.
+            eta(int): how many times more games each round plays, keeping 1/eta of the values
+            workers(int): processes to play games in. Defaults to one per core.
+            resultsDir(str): folder for results files, the manifest and the summary
+            seed(int): tournament seed
+            verbose(bool): print progress
+            recordFormat(str): "text" or "binary" results files. See Tournament.
+        """
+        self.playerType = playerType
+        self.grid = grid
+        self.opponent = opponent
+        self.options = options or {}
+        self.boardSizes = boardSizes
+        self.games = games
+        self.minGames = minGames
+        self.eta = eta
+        self.workers = workers
+        self.resultsDir = resultsDir
+        self.seed = seed
+        self.verbose = verbose
+        self.recordFormat = recordFormat
+        self.configs = self.makeConfigs()
+        # Index of config -> [wins, losses, draws] for the tuned player
+        self.scores = {}
+        # Index of config -> number of the last round it played in
+        self.rounds = {}
+
+    def makeConfigs(self):
+        """
+        Every combination of the grid's values.
+        Returns:
+            List[dict]
+        """
+        names = sorted(self.grid)
+        return [dict(zip(names, values)) for values in itertools.product(*[self.grid[name] for name in names])]
+
+    def player(self, config):
+        """
+        Args:
+            config(dict): one combination of values
+        Returns:
+            2-tuple(str, dict): the tuned player as given to Tournament
+        """
+        options = dict(self.options)
+        options.update(config)
+        return self.playerType, options
+
+    def budgets(self):
+        """
+        Games for each value by the end of each round.
+        Returns:
+            List[int]
+        """
+        if self.minGames is None or self.minGames >= self.games:
+            return [self.games]
+        budgets = []
+        budget = self.minGames
+        while budget < self.games:
+            budgets.append(budget)
+            budget *= self.eta
+        budgets.append(self.games)
+        return budgets
+
+    def run(self):
+        """
+        Play every round, then write the summary.
+        Returns:
+            List[2-tuple(dict, List[int])]: each config and its [wins,
+                losses, draws], best first.
+        """
+        os.makedirs(self.resultsDir, exist_ok=True)
+        alive = list(range(len(self.configs)))
+        budgets = self.budgets()
+        for number, budget in enumerate(budgets):
+            if self.verbose:
+                print("Round {}: {} values, {} games each".format(number+1, len(alive), budget))
+            matchups = []
+            for i in alive:
+                player = self.player(self.configs[i])
+                matchups += [(player, self.opponent), (self.opponent, player)]
+            # Each seat gets half the games, the first seat any odd one.
+            tournament = Tournament(matchups, self.boardSizes, games=(budget+1)//2, workers=self.workers, resultsDir=self.resultsDir, verbose=False, seed=self.seed, recordFormat=self.recordFormat)
+            results = tournament.run()
+            for i in alive:
+                self.scores[i] = self.score(self.configs[i], results)
+                self.rounds[i] = number
+            if number < len(budgets)-1:
+                alive.sort(key=lambda i: self.winRate(i), reverse=True)
+                alive = alive[:max(1, math.ceil(len(alive)/self.eta))]
+        ranking = self.ranking()
+        self.writeSummary(ranking)
+        return [(self.configs[i], self.scores[i]) for i in ranking]
+
+    def score(self, config, results):
+        """
+        Add up the tuned player's results over both seats and every board.
+        Args:
+            config(dict): one combination of values
+            results(dict): from Tournament.run
+        Returns:
+            List[int]: [wins, losses, draws]
+        """
+        player = self.player(config)
+        wins, losses, draws = 0, 0, 0
+        for width, height in self.boardSizes:
+            first = results[result_key(player, self.opponent, width, height, "standard")]
+            second = results[result_key(self.opponent, player, width, height, "standard")]
+            wins += first[0] + second[1]
+            losses += first[1] + second[0]
+            draws += first[2] + second[2]
+        return [wins, losses, draws]
+
+    def winRate(self, i):
+        """
+        Args:
+            i(int): index of config
+        Returns:
+            float: score of config i so far, draws counting as half
+        """
+        wins, losses, draws = self.scores[i]
+        n = wins + losses + draws
+        return (wins + draws/2)/n if n else 0.0
+
+    def ranking(self):
+        """
+        Configs that have played, the furthest round first and then by win rate.
+        Returns:
+            List[int]
+        """
+        return sorted(self.scores, key=lambda i: (self.rounds[i], self.winRate(i)), reverse=True)
+
+    def writeSummary(self, ranking):
+        """
+        Write a table of every config's results to summary.txt, and print it
+        if verbose.
+        Args:
+            ranking(List[int]): from ranking
+        """
+        names = sorted(self.grid)
+        header = names + ["round", "games", "wins", "losses", "draws", "score", "95% interval"]
+        rows = []
+        for i in ranking:
+            wins, losses, draws = self.scores[i]
+            n = wins + losses + draws
+            low, high = wilson_interval(wins + draws/2, n)
+            rows.append([str(self.configs[i][name]) for name in names] + [str(self.rounds[i]+1), str(n), str(wins), str(losses), str(draws), "{:.3f}".format(self.winRate(i)), "[{:.3f}, {:.3f}]".format(low, high)])
+        widths = [max(len(row[k]) for row in [header]+rows) for k in range(len(header))]
+        lines = ["  ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip() for row in [header]+rows]
+        with open(os.path.join(self.resultsDir, "summary.txt"), "w+") as outfile:
+            outfile.write("{} against {}\n".format(self.playerType, self.opponent))
+            outfile.write("\n".join(lines)+"\n")
+        if self.verbose:
+            print("\n".join(lines))
@@ -0,0 +1,156 @@
+try:
+    from Topology import get_topology
+except ModuleNotFoundError:
+    from DotsAndBoxes.Topology import get_topology
+from functools import lru_cache
+
+def _dot_transforms(width, height):
+    """
+    The symmetries of a board as functions on dot coordinates (x, y), with
+    x across and y down. Every board can be flipped either way or turned
+    half way round. Square boards can also be turned a quarter turn or
+    flipped about their diagonals.
+    Args:
+        width(int): number of dots across
+        height(int): number of dots down
+    Returns:
+        List[function]
+    """
+    w, h = width-1, height-1
+    transforms = [
+        lambda x, y: (x, y),
+        lambda x, y: (w-x, y),
+        lambda x, y: (x, h-y),
+        lambda x, y: (w-x, h-y),
+    ]
+    if width == height:
+        transforms += [
+            lambda x, y: (y, x),
+            lambda x, y: (h-y, x),
+            lambda x, y: (y, w-x),
+            lambda x, y: (h-y, w-x),
+        ]
+    return transforms
+
+def _edge_dots(move):
+    """
+    The two dots at the ends of a line.
+    Args:
+        move(3-tuple(int))
+    Returns:
+        2-tuple(2-tuple(int))
+    """
+    o, i, j = move
+    if o == 0:
+        # Horizontal line in row i, from dot j to dot j+1
+        return (j, i), (j+1, i)
+    # Vertical line in column i, from dot j to dot j+1
+    return (i, j), (i, j+1)
+
+def _dots_edge(a, b):
+    """
+    The line between two neighbouring dots.
+    Args:
+        a, b(2-tuple(int)): dot coordinates
+    Returns:
+        3-tuple(int)
+    """
+    (x1, y1), (x2, y2) = sorted([a, b])
+    if y1 == y2:
+        return (0, y1, x1)
+    return (1, x1, y1)
+
+@lru_cache(maxsize=None)
+def get_symmetries(width, height):
+    """
+    Edge permutation tables for every symmetry of a board size. Table t maps
+    edge e to the edge it lands on under symmetry t, so a position's image
+    has edge perm[e] drawn for each drawn edge e. Table 0 is the identity.
+    Args:
+        width(int)
+        height(int)
+    Returns:
+        Tuple[Tuple[int]]: 8 tables for square boards, otherwise 4.
+    """
+    topology = get_topology(width, height)
+    tables = []
+    for transform in _dot_transforms(width, height):
+        table = []
+        for move in topology.moves:
+            a, b = _edge_dots(move)
+            table.append(topology.index[_dots_edge(transform(*a), transform(*b))])
+        tables.append(tuple(table))
+    return tuple(tables)
+
+@lru_cache(maxsize=None)
+def get_inverses(width, height):
+    """
+    Inverse of each table from get_symmetries.
+    Args:
+        width(int)
+        height(int)
+    Returns:
+        Tuple[Tuple[int]]
+    """
+    inverses = []
+    for table in get_symmetries(width, height):
+        inverse = [0]*len(table)
+        for e, image in enumerate(table):
+            inverse[image] = e
+        inverses.append(tuple(inverse))
+    return tuple(inverses)
+
+def canonical_key(game):
+    """
+    Find a key for a position that is the same for all of its reflections and
+    rotations. The key under symmetry t is the Zobrist hash the position's
+    image under t would have, and the canonical key is the smallest of these.
+    The canonical key is therefore the ordinary hash of one of the symmetric
+    positions, so canonical and plain keys can share a table.
+    Like the hash, this doesn't depend on which player owns which boxes.
+    Args:
+        game(Game/BitboardGame): position to find the key for
+    Returns:
+        2-tuple(int, int): the canonical key, and the symmetry that takes the
+            game to the position it belongs to.
+    """
+    topology = game.topology
+    tables = get_symmetries(game.width, game.height)
+    zobristEdges = topology.zobristEdges
+    keys = [topology.zobristPlayers[game.currentPlayer]] * len(tables)
+    edges = game.get_edge_mask()
+    e = 0
+    while edges:
+        if edges & 1:
+            for t, table in enumerate(tables):
+                keys[t] ^= zobristEdges[table[e]]
+        edges >>= 1
+        e += 1
+    key = min(keys)
+    return key, keys.index(key)
+
+def transform_move(game, move, transform):
+    """
+    Move a line to where it lands under a symmetry.
+    Args:
+        game(Game/BitboardGame): any game of the right size
+        move(3-tuple(int))
+        transform(int): symmetry from canonical_key
+    Returns:
+        3-tuple(int)
+    """
+    topology = game.topology
+    return topology.moves[get_symmetries(game.width, game.height)[transform][topology.index[move]]]
+
+def untransform_move(game, move, transform):
+    """
+    Undo transform_move, bringing a line back from the canonical position.
+    Args:
+        game(Game/BitboardGame): any game of the right size
+        move(3-tuple(int))
+        transform(int): symmetry from canonical_key
+    Returns:
+        3-tuple(int)
+    """
+    topology = game.topology
+    return topology.moves[get_inverses(game.width, game.height)[transform][topology.index[move]]]
@@ -0,0 +1,85 @@
+from functools import lru_cache
+import random
+
+class BoardTopology:
+    """
+    Precomputed geometry for a board of a given width and height.
+    Edges are numbered in the same order that Game generates legal moves: all
+    horizontal lines (0, i, j) first, then all vertical lines (1, i, j).
+    Boxes are numbered row by row, so box (i, j) has index i*(width-1)+j.
+    Topologies never change once built, so one instance is shared by every
+    game of the same size.
+    """
+    def __init__(self, width, height):
+        """
+        Build all of the lookup tables for a width x height board.
+        Args:
+            width(int): number of dots across
+            height(int): number of dots down
+        """
+        self.width = width
+        self.height = height
+        # Edge index -> move tuple, in legal move generation order.
+        self.moves = [(0, i, j) for i in range(height) for j in range(width-1)]
+        self.moves += [(1, i, j) for i in range(width) for j in range(height-1)]
+        # Move tuple -> edge index
+        self.index = {move: e for e, move in enumerate(self.moves)}
+        self.noEdges = len(self.moves)
+        self.noBoxes = (width-1)*(height-1)
+        # Box index -> edge indices in the order [top, bottom, left, right]
+        boxEdges = []
+        for i in range(height-1):
+            for j in range(width-1):
+                boxEdges.append((
+                    self.index[(0, i, j)],
+                    self.index[(0, i+1, j)],
+                    self.index[(1, j, i)],
+                    self.index[(1, j+1, i)]))
+        self.boxEdges = tuple(boxEdges)
+        # Box index -> bitmask of its four edges
+        self.boxMasks = tuple(sum(1 << e for e in edges) for edges in self.boxEdges)
+        # Edge index -> indices of the one or two boxes it borders
+        edgeBoxes = [[] for e in range(self.noEdges)]
+        for b, edges in enumerate(self.boxEdges):
+            for e in edges:
+                edgeBoxes[e].append(b)
+        self.edgeBoxes = tuple(tuple(boxes) for boxes in edgeBoxes)
+        # Edges around the outside of the board, which only border one box.
+        self.borderEdges = tuple(e for e, boxes in enumerate(self.edgeBoxes) if len(boxes) == 1)
+        # Bitmask with every edge drawn, used to test for a finished game.
+        self.fullMask = (1 << self.noEdges) - 1
+        # Zobrist keys. A position's hash is the XOR of the keys of every drawn
+        # edge and the key of the player to move. The generator is seeded with
+        # the board size so every process builds the same keys.
+        rng = random.Random("{}x{}".format(width, height))
+        self.zobristEdges = tuple(rng.getrandbits(64) for e in range(self.noEdges))
+        self.zobristPlayers = tuple(rng.getrandbits(64) for p in range(8))
+
+    def box_coords(self, box):
+        """
+        Convert a box index back into (row, column) coordinates.
+        Args:
+            box(int): box index
+        Returns:
+            2-tuple(int)
+        """
+        return divmod(box, self.width-1)
+
+    def __reduce__(self):
+        """
+        Pickle topologies by size so unpickling goes back through the cache
+        rather than rebuilding the tables.
+        """
+        return (get_topology, (self.width, self.height))
+
+@lru_cache(maxsize=None)
+def get_topology(width, height):
+    """
+    Get the shared topology for a board size, building it on first use.
+    Args:
+        width(int)
+        height(int)
+    Returns:
+        BoardTopology
+    """
+    return BoardTopology(width, height)
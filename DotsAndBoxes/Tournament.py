@@ -0,0 +1,407 @@
+try:
+    from Game import Game
+    from GameVariants import SwedishGame, RandomGame
+    from PlayerFactory import PlayerFactory
+except ModuleNotFoundError:
+    from DotsAndBoxes.Game import Game
+    from DotsAndBoxes.GameVariants import SwedishGame, RandomGame
+    from DotsAndBoxes.PlayerFactory import PlayerFactory
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import json
+import os
+import random
+import zlib
+
+# Game classes by variant name.
+VARIANTS = {"standard": Game, "swedish": SwedishGame, "random": RandomGame}
+# Megabytes for each Minimax player's transposition table, unless its
+# options say otherwise. A tournament makes new players for every game, so
+# each one gets less than the 16 used in the GUI.
+TT_MEMORY = 2
+
+class Tournament:
+    """
+    Plays games between AI players without the GUI, spread over a pool of
+    worker processes. Each game is one task. The players are made in the
+    worker with PlayerFactory, so only their type and options are sent to it,
+    and only the finished game comes back.
+    A player is given either as a player type from PlayerFactory, such as
+    "Random Player", or as a 2-tuple of the type and a dict of keyword
+    arguments for makePlayer, such as ("Monte Carlo Player", {"timeLimit": 1}).
+    Results are counted for each pairing of matchup, board size and variant,
+    and can be written to results files that ReadStatistics can read, either
+    as text or as much smaller binary game records.
+    Every game has its own seed, worked out from the tournament seed, the
+    pairing and the game number, so a game plays the same whenever and
+    wherever it is run, apart from players that stop on a time limit.
+    With a results folder, each finished game is also added to a manifest,
+    manifest.jsonl, one JSON object per line. A run that is stopped part way
+    can be resumed by running the same tournament again: finished games are
+    counted from the manifest and only the rest are played.
+    Pairings can stop early with stopping rules from Stopping, such as an
+    SPRT, once their result is clear. After each game the rules are
+    checked on its pairing's results, and when one is met no more games are
+    started for that pairing. Games already running are still counted. Why
+    each pairing stopped is kept in stopReasons and the manifest, and listed
+    at the end of a verbose run.
+    """
+    def __init__(self, matchups, boardSizes=[(3, 3)], variants=["standard"], games=100, workers=None, resultsDir=None, verbose=True, seed=0, resume=True, stopping=None, recordFormat="text"):
+        """
+        Args:
+            matchups(List[2-tuple(str/2-tuple)]): player one and player two for each matchup
+            boardSizes(List[2-tuple(int)]): (width, height) of each board to play on
+            variants(List[str]): names from VARIANTS
+            games(int): games to play for each pairing
+            workers(int): processes to play games in. Defaults to one per core.
+            resultsDir(str): if given, every game is saved to a results file in this folder
+            verbose(bool): print a line as each pairing finishes
+            seed(int): seed that every game's seed is worked out from
+            resume(bool): carry on from the manifest in resultsDir if there
+                is one, rather than starting again
+            stopping(object/List[object]): stopping rules, each with a
+                check(counts) method that returns a reason to stop or None
+            recordFormat(str): "text" for save_statistics results files, or
+                "binary" for save_record ones
+        """
+        for variant in variants:
+            if variant not in VARIANTS:
+                raise ValueError("Unknown variant {}".format(variant))
+        if recordFormat not in ["text", "binary"]:
+            raise ValueError("Unknown record format {}".format(recordFormat))
+        self.matchups = matchups
+        self.boardSizes = boardSizes
+        self.variants = variants
+        self.games = games
+        self.workers = workers or os.cpu_count() or 1
+        self.resultsDir = resultsDir
+        self.verbose = verbose
+        self.seed = seed
+        self.resume = resume
+        self.recordFormat = recordFormat
+        if stopping is None:
+            stopping = []
+        elif not isinstance(stopping, (list, tuple)):
+            stopping = [stopping]
+        self.stopping = stopping
+        # key -> [p1wins, p2wins, draws], as from ReadStatistics.count_winners
+        self.results = {}
+        # (key, trial) of every game that has been played
+        self.completed = set()
+        # key -> why the pairing stopped early
+        self.stopReasons = {}
+
+    def pairings(self):
+        """
+        Every combination of matchup, board size and variant, in the order
+        they are played.
+        Returns:
+            List[5-tuple]: (player one, player two, width, height, variant)
+        """
+        return [(p1, p2, width, height, variant)
+                for (width, height) in self.boardSizes
+                for variant in self.variants
+                for (p1, p2) in self.matchups]
+
+    def tasks(self):
+        """
+        Generate the games still to play, one pairing after another.
+        Yields:
+            2-tuple(5-tuple, int): the pairing and the game number within it.
+        """
+        for pairing in self.pairings():
+            key = result_key(*pairing)
+            for i in range(self.games):
+                if key in self.stopReasons:
+                    break
+                if (key, i) not in self.completed:
+                    yield pairing, i
+
+    def gameSeed(self, key, trial):
+        """
+        Seed for one game. crc32 is used rather than hash() as string hashes
+        change between runs of Python.
+        Args:
+            key(5-tuple): from result_key
+            trial(int): game number within the pairing
+        Returns:
+            int
+        """
+        text = "|".join(str(part) for part in (self.seed,) + key + (trial,))
+        return zlib.crc32(text.encode())
+
+    def manifestFilename(self):
+        """
+        Returns:
+            str: manifest filename, or None without a results folder.
+        """
+        if self.resultsDir is None:
+            return None
+        return os.path.join(self.resultsDir, "manifest.jsonl")
+
+    def loadManifest(self):
+        """
+        Count the games in the manifest, and cut each results file back to
+        the end of its last game in the manifest. A game that was saved to
+        its results file but not yet to the manifest when the run stopped
+        is dropped and played again, so no game is counted twice. An
+        unfinished last line of the manifest is ignored the same way, and
+        the manifest is written out again without it.
+        Games past this run's number of games, from a longer run in the same
+        folder, are kept but not counted.
+        """
+        ends = {}
+        kept = []
+        with open(self.manifestFilename(), "r") as infile:
+            for line in infile:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                key = tuple(entry["key"])
+                if key not in self.results:
+                    # Kept for other runs that share the folder, like the
+                    # rounds of a Sweep.
+                    kept.append(line if line.endswith("\n") else line+"\n")
+                    continue
+                if "stopped" in entry:
+                    self.stopReasons[key] = entry["stopped"]
+                    kept.append(line if line.endswith("\n") else line+"\n")
+                    continue
+                if (key, entry["trial"]) in self.completed:
+                    continue
+                self.completed.add((key, entry["trial"]))
+                kept.append(line if line.endswith("\n") else line+"\n")
+                ends[key] = max(ends.get(key, 0), entry["end"])
+                if entry["trial"] < self.games:
+                    winner = entry["winner"]
+                    self.results[key][winner-1 if winner else 2] += 1
+        filename = self.manifestFilename()
+        with open(filename+".tmp", "w") as outfile:
+            outfile.writelines(kept)
+        os.replace(filename+".tmp", filename)
+        for key in self.results:
+            filename = self.resultsFilename(key)
+            if os.path.exists(filename):
+                with open(filename, "rb+") as outfile:
+                    outfile.truncate(ends.get(key, 0))
+            else:
+                open(filename, "w+").close()
+
+    def run(self, callback=None):
+        """
+        Play every game. A few tasks per worker are kept queued at a time, so
+        results stream back while the rest are still to be submitted.
+        Args:
+            callback(function): if given, called in this process as
+                callback(key, game) after each game finishes, where key is
+                from result_key.
+        Returns:
+            dict{5-tuple: List[int]}: [p1wins, p2wins, draws] for each key.
+                Why any pairings stopped early is left in stopReasons, and
+                listed at the end if verbose.
+        """
+        self.results = {result_key(*pairing): [0, 0, 0] for pairing in self.pairings()}
+        self.completed = set()
+        self.stopReasons = {}
+        if self.resultsDir is not None:
+            if self.resume and os.path.exists(self.manifestFilename()):
+                self.loadManifest()
+            else:
+                open(self.manifestFilename(), "w+").close()
+                for key in self.results:
+                    open(self.resultsFilename(key), "w+").close()
+        pending = {}
+        for key in self.results:
+            self.checkStop(key, pending)
+        tasks = self.tasks()
+        finished = {key: sum(self.results[key]) for key in self.results}
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker) as pool:
+            while True:
+                while len(pending) < 4*self.workers:
+                    task = next(tasks, None)
+                    if task is None:
+                        break
+                    pairing, i = task
+                    seed = self.gameSeed(result_key(*pairing), i)
+                    pending[pool.submit(play_game, *pairing, seed=seed)] = (pairing, i, seed)
+                if not pending:
+                    break
+                done, notDone = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pairing, i, seed = pending.pop(future)
+                    if future.cancelled():
+                        continue
+                    key = result_key(*pairing)
+                    game = future.result()
+                    self.record(key, i, seed, game)
+                    if callback is not None:
+                        callback(key, game)
+                    finished[key] += 1
+                    if self.verbose and finished[key] == self.games:
+                        print("Completed trials: {} vs {} on {}x{} {}: {}".format(*key, self.results[key]))
+                    self.checkStop(key, pending)
+        # Pairings stopped in an earlier run are only in the manifest, so
+        # list every one here.
+        if self.verbose and self.stopReasons:
+            print("Stopped early:")
+            for key, reason in self.stopReasons.items():
+                print("    {} vs {} on {}x{} {} after {} games: {}".format(*key, sum(self.results[key]), reason))
+        return self.results
+
+    def checkStop(self, key, pending):
+        """
+        Check the stopping rules for a pairing. If one is met, note why, and
+        cancel its games that haven't started yet.
+        Args:
+            key(5-tuple): from result_key
+            pending(dict{Future: 3-tuple}): games submitted to the pool
+        """
+        if key in self.stopReasons or sum(self.results[key]) >= self.games:
+            return
+        for rule in self.stopping:
+            reason = rule.check(self.results[key])
+            if reason is not None:
+                break
+        else:
+            return
+        self.stopReasons[key] = reason
+        for future, (pairing, i, seed) in pending.items():
+            if result_key(*pairing) == key:
+                future.cancel()
+        if self.resultsDir is not None:
+            with open(self.manifestFilename(), "a+") as outfile:
+                outfile.write(json.dumps({"key": key, "stopped": reason})+"\n")
+        if self.verbose:
+            print("Stopped trials: {} vs {} on {}x{} {} after {} games: {}".format(*key, sum(self.results[key]), reason))
+
+    def record(self, key, trial, seed, game):
+        """
+        Count a finished game. If there is a results folder, save it to its
+        results file and then add it to the manifest.
+        Args:
+            key(5-tuple): from result_key
+            trial(int): game number within the pairing
+            seed(int): seed the game was played with
+            game(Game): finished game
+        """
+        winner = game.winner()
+        self.results[key][winner-1 if winner else 2] += 1
+        self.completed.add((key, trial))
+        if self.resultsDir is not None:
+            filename = self.resultsFilename(key)
+            if self.recordFormat == "binary":
+                game.save_record(filename, key[:2], seed)
+            else:
+                game.save_statistics(filename, "a+")
+            entry = {"key": key, "trial": trial, "seed": seed, "winner": winner, "end": os.path.getsize(filename)}
+            with open(self.manifestFilename(), "a+") as outfile:
+                outfile.write(json.dumps(entry)+"\n")
+                outfile.flush()
+                os.fsync(outfile.fileno())
+
+    def resultsFilename(self, key):
+        """
+        Results filename for a key, in the format ReadStatistics expects.
+        Args:
+            key(5-tuple): from result_key
+        Returns:
+            str
+        """
+        p1name, p2name, width, height, variant = key
+        name = "1_{}_2_{}_{}x{}".format(p1name, p2name, width, height)
+        if variant != "standard":
+            name += "_" + variant
+        extension = ".dbr" if self.recordFormat == "binary" else ".txt"
+        return os.path.join(self.resultsDir, name + extension)
+
+def player_spec(player):
+    """
+    Split a player into its type and makePlayer keyword arguments.
+    Args:
+        player(str/2-tuple(str, dict)): player as given to Tournament
+    Returns:
+        2-tuple(str, dict)
+    """
+    if isinstance(player, str):
+        return player, {}
+    return player[0], dict(player[1])
+
+def player_name(player):
+    """
+    Short name for a player, used in result keys and filenames. This is the
+    first word of its type, followed by any options in order.
+    Args:
+        player(str/2-tuple(str, dict)): player as given to Tournament
+    Returns:
+        str
+    """
+    playerType, options = player_spec(player)
+    name = playerType.split()[0]
+    for option in sorted(options):
+        name += "-{}{}".format(option, options[option])
+    # ReadStatistics splits filenames on underscores.
+    return name.replace("_", "")
+
+def result_key(p1, p2, width, height, variant):
+    """
+    Key that a pairing's results are kept under.
+    Returns:
+        5-tuple: (p1name, p2name, width, height, variant)
+    """
+    return player_name(p1), player_name(p2), width, height, variant
+
+def play_game(p1, p2, width, height, variant="standard", seed=None):
+    """
+    Make two players and play one game between them. Run in a worker process.
+    Args:
+        p1, p2(str/2-tuple(str, dict)): players as given to Tournament
+        width(int)
+        height(int)
+        variant(str): name from VARIANTS
+        seed(int): if given, the random module is seeded with it first
+    Returns:
+        Game: the finished game
+    """
+    if seed is not None:
+        random.seed(seed)
+    factory = PlayerFactory()
+    players = []
+    for index, player in enumerate([p1, p2], 1):
+        playerType, options = player_spec(player)
+        options.setdefault("ttMemory", TT_MEMORY)
+        players.append(factory.makePlayer(playerType, index, **options))
+    game = VARIANTS[variant](width, height)
+    try:
+        while not game.is_finished():
+            player = players[game.currentPlayer-1]
+            game.take_turn(player.chooseMove(game.get_copy()))
+    finally:
+        for player in players:
+            player.close()
+    return game
+
+def _init_worker():
+    """
+    Give each worker process its own random sequence. Forked workers would
+    otherwise all play the same games.
+    """
+    random.seed()
+
+def main(resultsDir=os.path.join("Results", "tournament"), games=10000, stopping=None):
+    """
+    Random and ordered players against each other on the usual board sizes.
+    Args:
+        resultsDir(str): folder to save results files in
+        games(int): most games for each pairing
+        stopping(object/List[object]): stopping rules from Stopping
+    """
+    os.makedirs(resultsDir, exist_ok=True)
+    matchups = [("Random Player", "Random Player"),
+                ("Random Player", "Ordered Player"),
+                ("Ordered Player", "Random Player")]
+    tournament = Tournament(matchups, [(3, 3), (4, 4), (5, 5), (6, 6)], games=games, resultsDir=resultsDir, stopping=stopping)
+    tournament.run()
+    print("\n\nAll trials completed.")
+
+if __name__ == '__main__':
+    main()
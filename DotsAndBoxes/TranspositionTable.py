@@ -0,0 +1,84 @@
+from array import array
+
+# Entry types. An exact score, or a bound from a search that was cut off.
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+class TranspositionTable:
+    """
+    Fixed size hash table of search results for Minimax, keyed by a position's
+    Zobrist hash. Each slot holds the score, the depth searched, whether the
+    score is exact or a bound, and the best move found.
+    Slots are kept in flat arrays so the memory used is fixed up front.
+    When two positions want the same slot the deeper search is kept, unless
+    the stored entry is left over from an earlier move.
+    """
+    # Approximate bytes for one slot: key, score, depth, flag, age and a
+    # reference to the best move tuple.
+    ENTRY_BYTES = 8 + 4 + 1 + 1 + 1 + 8
+
+    def __init__(self, memory=16):
+        """
+        Create an empty table.
+        Args:
+            memory(int/float): memory budget for the table in megabytes.
+        """
+        self.size = max(1, int(memory*1024*1024) // self.ENTRY_BYTES)
+        self.clear()
+
+    def new_search(self):
+        """
+        Start a new search. Entries from previous searches are kept but can
+        be replaced by anything from this one.
+        """
+        self.age = (self.age + 1) % 256
+
+    def probe(self, key):
+        """
+        Look up a position.
+        Args:
+            key(int): Zobrist hash of the position
+        Returns:
+            4-tuple(int, int, int, 3-tuple(int)): score, depth, flag and best
+                move, or None if the position isn't in the table.
+        """
+        slot = key % self.size
+        if self.depths[slot] >= 0 and self.keys[slot] == key:
+            return self.scores[slot], self.depths[slot], self.flags[slot], self.moves[slot]
+        return None
+
+    def store(self, key, depth, score, flag, move):
+        """
+        Store a search result, using depth-preferred replacement.
+        Args:
+            key(int): Zobrist hash of the position
+            depth(int): depth the position was searched to
+            score(int): score found
+            flag(int): EXACT, LOWER or UPPER
+            move(3-tuple(int)): best move found, or None
+        """
+        slot = key % self.size
+        oldDepth = self.depths[slot]
+        if oldDepth < 0 or self.ages[slot] != self.age or self.keys[slot] == key or depth >= oldDepth:
+            self.keys[slot] = key
+            self.scores[slot] = score
+            self.depths[slot] = min(depth, 127)
+            self.flags[slot] = flag
+            self.ages[slot] = self.age
+            self.moves[slot] = move
+
+    def clear(self):
+        """
+        Empty the table. New arrays are made rather than resetting each slot,
+        which would take a Python loop over the whole table.
+        """
+        size = self.size
+        self.keys = array("Q", bytes(8*size))
+        self.scores = array("i", bytes(4*size))
+        # Depth of -1 marks an empty slot.
+        self.depths = array("b", [-1]) * size
+        self.flags = array("B", bytes(size))
+        self.ages = array("B", bytes(size))
+        self.moves = [None] * size
+        self.age = 0
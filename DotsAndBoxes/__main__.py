@@ -3,6 +3,7 @@ import os
 from PyQt5.QtWidgets import QApplication
 import GameGUI
 import Experiment
+import Tournament
 import ReadStatistics
 
 def main():
@@ -11,9 +12,10 @@ def main():
         # >python DotsAndBoxes Results\\1_minimax_2_monty_3x3.txt
         if os.path.isfile(sys.argv[1]):
             ReadStatistics.get_scores(sys.argv[1])
-        # this is to run specific experiment in Experiment.
+        # this runs the headless tournament. It can also be run without Qt with
+        # >python DotsAndBoxes/Tournament.py
         elif int(sys.argv[1]) == 2:
-            Experiment.tournament()
+            Tournament.main()
         # Launching with an extra argument will launch into expriment mode, where multiple games are played
         # >python DotsAndBoxes 1
         else:
@@ -1,7 +1,14 @@
 import unittest
 import random
-from DotsAndBoxes import Game, PlayerFactory
+import os
+import re
+import tempfile
+import io
+import contextlib
+from DotsAndBoxes import Game, PlayerFactory, BitboardGame, TranspositionTable, EndgameSolver, Rollout, Symmetry, Tournament, Stopping, Sweep, ReadStatistics
+from DotsAndBoxes.GameVariants import SwedishGame, RandomGame
 import DotsAndBoxes.MonteCarloPlayer
+import DotsAndBoxes.MonteCarloArrayTree
 import DotsAndBoxes.MinimaxPlayer
 
 class TestGameMethods(unittest.TestCase):
@@ -61,6 +68,57 @@ class TestGameMethods(unittest.TestCase):
         self.assertEqual(gOriginal.currentPlayer, 2)
         self.assertEqual(gCopy.currentPlayer, 1)
 
+    def test_compact_copy(self):
+        """
+        Test games, lines and boxes don't carry a __dict__, and that the boxes
+        of a copy are wired to the copy's own lines.
+        """
+        g = Game.Game(4,3)
+        for move in [(0,0,0), (1,0,0), (0,1,0), (1,1,0)]:
+            g.take_turn(move)
+        gCopy = g.get_copy()
+        for obj in [gCopy, gCopy.grid[0][0][0], gCopy.boxes[0][0], gCopy.legalMoves]:
+            self.assertFalse(hasattr(obj, "__dict__"))
+        box = gCopy.boxes[1][2]
+        self.assertIs(box.top, gCopy.grid[0][1][2])
+        self.assertIs(box.bottom, gCopy.grid[0][2][2])
+        self.assertIs(box.left, gCopy.grid[1][2][1])
+        self.assertIs(box.right, gCopy.grid[1][3][1])
+        self.assertEqual(gCopy.boxes[0][0].owner, 2)
+        self.assertEqual(gCopy.get_scores(), g.get_scores())
+        gCopy.take_turn((0,1,2))
+        self.assertEqual(gCopy.boxes[0][2].sides_completed(), 1)
+        self.assertEqual(g.boxes[0][2].sides_completed(), 0)
+        # Copies of the variants stay the same variant, without a __dict__.
+        for variant in [SwedishGame(4,3), RandomGame(4,3)]:
+            vCopy = variant.get_copy()
+            self.assertIs(type(vCopy), type(variant))
+            self.assertEqual(vCopy.variant, variant.variant)
+            self.assertFalse(hasattr(vCopy, "__dict__"))
+            self.assertTrue(vCopy == variant)
+
+    def test_shared_topology(self):
+        """
+        Test every game of one size shares one topology, including the variants
+        and copies, and that it finds the right boxes for each line.
+        """
+        g = Game.Game(5,4)
+        for other in [Game.Game(5,4), g.get_copy(), SwedishGame(5,4), RandomGame(5,4)]:
+            self.assertIs(other.topology, g.topology)
+        self.assertIsNot(Game.Game(4,5).topology, g.topology)
+        for move in g.get_all_legal_moves():
+            o, i, j = move
+            if o == 0:
+                expected = [(r, j) for r in (i-1, i) if 0 <= r < g.height-1]
+            else:
+                expected = [(j, c) for c in (i-1, i) if 0 <= c < g.width-1]
+            self.assertEqual(g.get_boxes_for_line(move), [g.boxes[r][c] for r, c in expected])
+        # Swedish games block exactly the lines with one box.
+        swedish = SwedishGame(5,4)
+        blocked = [move for move in g.topology.moves if swedish.grid[move[0]][move[1]][move[2]]]
+        self.assertEqual(blocked, [g.topology.moves[e] for e in g.topology.borderEdges])
+        self.assertEqual(len(blocked), 2*(5-1) + 2*(4-1))
+
     def test_play_game(self):
         """
         Test creating and playing a game.
@@ -358,6 +416,63 @@ class TestGameMethods(unittest.TestCase):
         self.assertEqual(lines[45], "(1, 1, 0)\n")
         self.assertEqual(lines[51], "9, 0\n")
 
+    def test_saving_records(self):
+        """
+        Test binary game records read back as the same games, for every
+        variant and for boards with more lines than fit in a byte, and that
+        they are smaller than the text format.
+        """
+        with tempfile.TemporaryDirectory() as folder:
+            filename = os.path.join(folder, "records.dbr")
+            textname = os.path.join(folder, "records.txt")
+            games = []
+            rng = random.Random(3)
+            for g in [Game.Game(4, 4), SwedishGame(5, 4), RandomGame(5, 5), Game.Game(13, 12)]:
+                while not g.is_finished():
+                    g.take_turn(g.random_legal_move(rng))
+                g.save_record(filename, ("Random", "Ordered"), len(games))
+                g.save_statistics(textname, "a+")
+                games.append(g)
+            records = list(ReadStatistics.read_records(filename))
+            self.assertEqual(len(records), 4)
+            for i, (g, record) in enumerate(zip(games, records)):
+                self.assertEqual((record["width"], record["height"]), (g.width, g.height))
+                self.assertEqual(record["variant"], g.variant)
+                self.assertEqual(record["players"], ("Random", "Ordered"))
+                self.assertEqual(record["seed"], i)
+                self.assertEqual(record["moves"], g.movesMade)
+                self.assertEqual(record["scores"], (g.get_scores()[1], g.get_scores()[2]))
+                # Replaying the record gives the same game.
+                replay = Game.Game(g.width, g.height)
+                for move in record["blocked"]:
+                    replay.block_line(move)
+                for move in record["moves"]:
+                    replay.take_turn(move)
+                self.assertEqual(replay.get_scores(), g.get_scores())
+            self.assertEqual([record["variant"] for record in records], ["standard", "swedish", "random", "standard"])
+            self.assertEqual(len(records[1]["blocked"]), 2*4 + 2*3)
+            self.assertTrue(ReadStatistics.is_record_file(filename))
+            self.assertFalse(ReadStatistics.is_record_file(textname))
+            self.assertLess(os.path.getsize(filename)*4, os.path.getsize(textname))
+            self.assertEqual(ReadStatistics.count_record_winners(filename), [sum(1 for g in games if g.winner() == w) for w in (1, 2, 0)])
+            # Long names are cut on a character boundary, so the record and
+            # the ones after it still read back.
+            longName = "\u00e9\u00f8" * 100
+            games[0].save_record(filename, (longName, "\u00d8rsted"), 0)
+            games[1].save_record(filename, ("Random", "Ordered"), 1)
+            records = list(ReadStatistics.read_records(filename))
+            self.assertEqual(len(records), 6)
+            self.assertTrue(longName.startswith(records[4]["players"][0]))
+            self.assertEqual(len(records[4]["players"][0].encode("utf-8")), 254)
+            self.assertEqual(records[4]["players"][1], "\u00d8rsted")
+            self.assertEqual(records[4]["moves"], games[0].movesMade)
+            self.assertEqual(records[5]["players"], ("Random", "Ordered"))
+            # A record cut off part way is an error, not a shorter game.
+            with open(filename, "rb+") as f:
+                f.truncate(os.path.getsize(filename)-1)
+            with self.assertRaises(ValueError):
+                list(ReadStatistics.read_records(filename))
+
     def test_game_equality(self):
         """
         Test that game objects' eqality method works correctly.
@@ -395,6 +510,227 @@ class TestGameMethods(unittest.TestCase):
         self.assertTrue(g1 == g2)
         self.assertTrue(g1 == g3)
 
+    def test_undo_move(self):
+        """
+        Test that undoing moves returns the game to exactly how it was.
+        Plays a whole game, then undoes every move checking the game matches
+        a copy taken at each step on the way forward.
+        """
+        g = Game.Game(4, 4)
+        moves = g.get_all_legal_moves()
+        random.shuffle(moves)
+        history = []
+        for m in moves:
+            history.append((g.get_copy(), g.get_all_legal_moves(), g.get_scores()))
+            g.take_turn(m)
+        self.assertTrue(g.is_finished())
+        for m in reversed(moves):
+            self.assertEqual(g.undo_move(), m)
+            copy, legalMoves, scores = history.pop()
+            self.assertTrue(g == copy)
+            self.assertEqual(sorted(g.get_all_legal_moves()), sorted(legalMoves))
+            self.assertEqual(g.get_scores(), scores)
+            self.assertEqual(g.movesMade, copy.movesMade)
+        # Nothing left to undo, and illegal moves are never recorded.
+        self.assertIsNone(g.undo_move())
+        g.take_turn((5, 5, 5))
+        self.assertIsNone(g.undo_move())
+
+    def test_legal_move_set(self):
+        """
+        Test that legal moves stay correct as moves are made and undone, and
+        that the random and iterator views agree with them.
+        """
+        g = Game.Game(4,4)
+        expected = sorted(g.get_all_legal_moves())
+        random.seed(3)
+        for i in range(10):
+            move = g.random_legal_move()
+            self.assertTrue(g.is_legal_move(move))
+            g.take_turn(move)
+            expected.remove(move)
+            self.assertFalse(g.is_legal_move(move))
+            self.assertEqual(sorted(g.get_all_legal_moves()), expected)
+            self.assertEqual(sorted(g.iter_legal_moves()), expected)
+        for i in range(10):
+            expected.append(g.undo_move())
+        self.assertEqual(sorted(g.get_all_legal_moves()), sorted(expected))
+        self.assertFalse(g.is_legal_move([0, 0, 0]))
+        self.assertEqual(len(g.legalMoves), 24)
+
+    def test_incremental_counts(self):
+        """
+        Test the score and side counters kept by take_turn, undo_move and
+        block_line match counting every box from scratch.
+        """
+        def recount(game):
+            scores = {0:0, 1:0, 2:0}
+            sides = [0, 0, 0, 0, 0]
+            for row in game.boxes:
+                for box in row:
+                    scores[box.owner] += 1
+                    sides[sum([bool(x) for x in box.edges])] += 1
+            return scores, sides
+
+        random.seed(5)
+        for g in [Game.Game(4,4), SwedishGame(5,4)]:
+            while not g.is_finished():
+                g.take_turn(g.random_legal_move())
+                b = BitboardGame.BitboardGame.from_game(g)
+                self.assertEqual((g.get_scores(), g.get_side_counts()), recount(g))
+                self.assertEqual((b.get_scores(), b.get_side_counts()), recount(g))
+                self.assertEqual(g.check_score(1), b.check_score(1))
+            for i in range(len(g.movesMade)):
+                g.undo_move()
+                self.assertEqual((g.get_scores(), g.get_side_counts()), recount(g))
+            self.assertEqual(g.get_copy().get_side_counts(), g.get_side_counts())
+        b = BitboardGame.BitboardGame(4,4)
+        for move in b.get_all_legal_moves():
+            b.take_turn(move)
+        self.assertEqual(b.get_side_counts(), [0, 0, 0, 0, 9])
+        while b.undo_move():
+            pass
+        self.assertEqual((b.get_scores(), b.get_side_counts()), ({0:9, 1:0, 2:0}, [9, 0, 0, 0, 0]))
+
+    def test_game_hash(self):
+        """
+        Test that the Zobrist hash is kept up to date as moves are made and undone.
+        Equal games should always have equal hashes, whatever order the moves
+        were made in.
+        """
+        g1 = Game.Game(3,5)
+        g2 = Game.Game(3,5)
+        self.assertEqual(hash(g1), hash(g2))
+        moves = [(1,1,1), (0,0,0), (1,0,0), (0,1,1)]
+        for m in moves:
+            g1.take_turn(m)
+            self.assertEqual(g1.hash, g1.compute_hash())
+        # Same lines but a different player to move
+        self.assertNotEqual(g1.hash, g2.hash)
+        # Same moves in a different order reach the same position
+        for m in [(1,0,0), (0,1,1), (1,1,1), (0,0,0)]:
+            g2.take_turn(m)
+        self.assertTrue(g1 == g2)
+        self.assertEqual(hash(g1), hash(g2))
+        self.assertEqual(g1.get_copy().hash, g1.hash)
+        # Undoing a move restores the previous hash
+        g1.take_turn((0,2,0))
+        g1.undo_move()
+        self.assertEqual(g1.hash, g2.hash)
+        # The bitboard backend hashes positions the same way
+        self.assertEqual(BitboardGame.BitboardGame.from_game(g1).hash, g1.hash)
+
+class TestBitboardMethods(unittest.TestCase):
+    def test_matches_game(self):
+        """
+        Test that the bitboard backend plays out exactly like Game.
+        Both games are given the same random moves, and after every move the
+        turn, legal moves and scores should be identical.
+        """
+        for width, height in [(3, 3), (4, 5), (6, 4)]:
+            g = Game.Game(width, height)
+            b = BitboardGame.BitboardGame(width, height)
+            moves = sorted(g.get_all_legal_moves())
+            self.assertEqual(moves, b.get_all_legal_moves())
+            random.shuffle(moves)
+            for m in moves:
+                g.take_turn(m)
+                b.take_turn(m)
+                self.assertEqual(g.currentPlayer, b.currentPlayer)
+                self.assertEqual(sorted(g.get_all_legal_moves()), b.get_all_legal_moves())
+                self.assertEqual(g.get_scores(), b.get_scores())
+                self.assertEqual(g.get_side_counts(), b.get_side_counts())
+            self.assertTrue(b.is_finished())
+            self.assertEqual(g.winner(), b.winner())
+
+    def test_copy_and_convert(self):
+        """
+        Test converting a Game part way through, and that copies are independent.
+        """
+        g = Game.Game(4, 4)
+        for m in g.get_all_legal_moves()[0:12]:
+            g.take_turn(m)
+        b = BitboardGame.BitboardGame.from_game(g)
+        self.assertEqual(b.get_all_legal_moves(), sorted(g.get_all_legal_moves()))
+        self.assertEqual(b.get_scores(), g.get_scores())
+        self.assertEqual(b.currentPlayer, g.currentPlayer)
+        bCopy = b.get_copy()
+        self.assertTrue(b == bCopy)
+        b.take_turn((1, 2, 2))
+        self.assertFalse(b.is_legal_move((1, 2, 2)))
+        self.assertTrue(bCopy.is_legal_move((1, 2, 2)))
+        self.assertFalse(b == bCopy)
+        # Bad moves are rejected without changing the game
+        for bad in [(5, 5, 5), 0, "string", None, [0, 0, 0]]:
+            b.take_turn(bad)
+        self.assertEqual(len(b.movesMade), 13)
+
+    def test_undo_move(self):
+        """
+        Test that undoing moves on a bitboard returns it to how it was.
+        """
+        b = BitboardGame.BitboardGame(4, 3)
+        moves = b.get_all_legal_moves()
+        random.shuffle(moves)
+        history = []
+        for m in moves:
+            history.append(b.get_copy())
+            b.take_turn(m)
+        for m in reversed(moves):
+            self.assertEqual(b.undo_move(), m)
+            self.assertTrue(b == history.pop())
+        self.assertIsNone(b.undo_move())
+
+    def test_hash_updates(self):
+        """
+        Test that a bitboard's hash follows the same positions as Game.
+        """
+        g = Game.Game(4, 4)
+        b = BitboardGame.BitboardGame(4, 4)
+        moves = g.get_all_legal_moves()
+        random.shuffle(moves)
+        for m in moves:
+            g.take_turn(m)
+            b.take_turn(m)
+            self.assertEqual(b.hash, g.hash)
+        for m in moves:
+            g.undo_move()
+            b.undo_move()
+            self.assertEqual(b.hash, g.hash)
+        self.assertEqual(hash(b), hash(BitboardGame.BitboardGame(4, 4)))
+
+    def test_minimax_on_bitboard(self):
+        """
+        Minimax should choose the same move whichever backend it searches.
+        """
+        g = Game.Game(3,3)
+        minimax = DotsAndBoxes.MinimaxPlayer.MinimaxPlayer(1, colour="red", timeLimit=1, maxDepth=2)
+        move = minimax.chooseMove(BitboardGame.BitboardGame.from_game(g))
+        self.assertEqual(move, (1,1,1))
+
+    def test_players_search_bitboards(self):
+        """
+        Test the AI players search a BitboardGame copy when given a Game,
+        leaving the Game alone, and that a bitboard never equals a Game.
+        """
+        g = Game.Game(4,4)
+        for move in [(0,0,0), (1,1,1), (0,2,1)]:
+            g.take_turn(move)
+        before = g.get_copy()
+        minimax = DotsAndBoxes.MinimaxPlayer.MinimaxPlayer(g.currentPlayer, timeLimit=0.2, maxDepth=2)
+        self.assertEqual(minimax.chooseMove(g), minimax.chooseMove(BitboardGame.BitboardGame.from_game(g)))
+        self.assertEqual(g, before)
+        for storage in ["objects", "arrays", "dag"]:
+            player = DotsAndBoxes.MonteCarloPlayer.MonteCarloPlayer(g.currentPlayer, timeLimit=0.05, storage=storage)
+            self.assertTrue(g.is_legal_move(player.chooseMove(g)))
+            game = player.tree.game if storage == "arrays" else player.tree.root.game
+            self.assertIsInstance(game, BitboardGame.BitboardGame)
+        self.assertEqual(g, before)
+        bitboard = BitboardGame.BitboardGame.from_game(g)
+        self.assertFalse(bitboard == g)
+        self.assertTrue(bitboard != g)
+        self.assertEqual(bitboard, BitboardGame.BitboardGame.from_game(bitboard))
+
 class TestPlayerMethods(unittest.TestCase):
     def test_playerfactory(self):
         """
@@ -520,6 +856,261 @@ class TestMonteCarloMethods(unittest.TestCase):
         self.assertEqual(n2.n, 1.0)
         self.assertEqual(n3.n, 1.0)
 
+    def test_lazy_expansion(self):
+        """
+        Test that children are created one at a time, in move order, and
+        only get a game state once it is needed.
+        """
+        g = Game.Game(3,3)
+        node = DotsAndBoxes.MonteCarloPlayer.MonteCarloNode(1, g, (0,0,0), "Root")
+        moves = g.get_all_legal_moves()
+        child = node.chooseChild()
+        self.assertEqual(len(node.children), 1)
+        self.assertEqual(child.move, moves[0])
+        self.assertIsNone(child._game)
+        expected = g.get_copy()
+        expected.take_turn(moves[0])
+        self.assertEqual(child.game, expected)
+        # The original game is untouched
+        self.assertEqual(g, Game.Game(3,3))
+        child.backpropagate(1)
+        self.assertEqual(node.chooseChild().move, moves[1])
+        # getChild expands a move out of order, makeChildren expands the rest.
+        self.assertEqual(node.getChild(moves[5]).move, moves[5])
+        self.assertIsNone(node.findChild(moves[6]))
+        node.makeChildren()
+        self.assertEqual(sorted(c.move for c in node.children), moves)
+        self.assertEqual(node.untriedMoves, [])
+
+    def test_rollout_kernel(self):
+        """
+        Test the rollout kernel gets the same winner as playing the same
+        shuffled moves through take_turn, and leaves the game unchanged.
+        """
+        for seed in range(50):
+            g = Game.Game(4,4)
+            rng = random.Random(seed)
+            for move in rng.sample(g.get_all_legal_moves(), seed % 20):
+                g.take_turn(move)
+            before = g.get_copy()
+            # The kernel shuffles the moves from horizontal lines then vertical lines.
+            moves = sorted(g.get_all_legal_moves())
+            random.Random(seed).shuffle(moves)
+            played = g.get_copy()
+            for move in moves:
+                played.take_turn(move)
+            self.assertEqual(Rollout.random_rollout(g, random.Random(seed)), played.winner())
+            self.assertEqual(Rollout.random_rollout(BitboardGame.BitboardGame.from_game(g), random.Random(seed)), played.winner())
+            self.assertEqual(g, before)
+            self.assertEqual(g.get_edge_mask(), BitboardGame.BitboardGame.from_game(g).edges)
+
+    def test_batch_rollout(self):
+        """
+        Test batched rollouts give one winner per playout, that a finished
+        game always gives its real winner, and that a tree can search with them.
+        """
+        g = Game.Game(4,4)
+        for move in g.get_all_legal_moves()[:10]:
+            g.take_turn(move)
+        winners = list(Rollout.batch_rollout(g, 200))
+        self.assertEqual(len(winners), 200)
+        self.assertTrue(set(winners) <= {0, 1, 2})
+        # Both players win some random games from here.
+        self.assertIn(1, winners)
+        self.assertIn(2, winners)
+        finished = Game.Game(3,3)
+        for move in finished.get_all_legal_moves():
+            finished.take_turn(move)
+        self.assertEqual(list(Rollout.batch_rollout(finished, 5)), [finished.winner()]*5)
+
+        mct = DotsAndBoxes.MonteCarloPlayer.MonteCarloTree(1, 0.1, rolloutBatch=16)
+        mct.update(g.get_copy())
+        root = mct.root
+        move = mct.nextMove()
+        self.assertTrue(g.is_legal_move(move))
+        # Every visit is a batch of 16 rollouts.
+        self.assertGreater(root.n, 0)
+        self.assertEqual(root.n % 16, 0)
+
+        # A player with the default settings plays its batches with batch_rollout.
+        module = DotsAndBoxes.MonteCarloPlayer
+        calls = []
+        original = module.batch_rollout
+        def counted(*args, **kwargs):
+            calls.append(args)
+            return original(*args, **kwargs)
+        module.batch_rollout = counted
+        try:
+            player = PlayerFactory.PlayerFactory().makePlayer("Monte Carlo Player", 1, timeLimit=0.1, rolloutBatch=16)
+            self.assertTrue(g.is_legal_move(player.chooseMove(g.get_copy())))
+        finally:
+            module.batch_rollout = original
+        self.assertTrue(calls)
+        self.assertTrue(all(args[1] == 16 for args in calls))
+
+    def test_greedy_rollout(self):
+        """
+        Test the greedy rollout policy takes every box it can and only gives
+        a box its third side when it has to, and that its winner is right.
+        """
+        for seed in range(30):
+            g = Game.Game(4,4)
+            rng = random.Random(seed)
+            for move in rng.sample(g.get_all_legal_moves(), seed % 20):
+                g.take_turn(move)
+            before = g.get_copy()
+            sides, free, margin = Rollout.rollout_state(g)
+            movers = []
+            winner = Rollout.greedy_play_out(g.topology, sides, free, margin, g.currentPlayer, random.Random(seed), movers)
+            self.assertEqual(free, [])
+            played = g.get_copy()
+            for e, mover in movers:
+                move = g.topology.moves[e]
+                self.assertEqual(played.currentPlayer, mover)
+                legal = played.get_all_legal_moves()
+                captures = [m for m in legal if 3 in played.get_box_sides_for_line(m)]
+                safe = [m for m in legal if max(played.get_box_sides_for_line(m)) < 2]
+                if captures:
+                    self.assertIn(move, captures)
+                elif safe:
+                    self.assertIn(move, safe)
+                played.take_turn(move)
+            self.assertEqual(winner, played.winner())
+            self.assertEqual(Rollout.greedy_rollout(g, random.Random(seed)), winner)
+            self.assertEqual(g, before)
+
+        winner, played = Rollout.amaf_rollout(g, random.Random(1), "greedy")
+        self.assertEqual(sorted(played[1] | played[2]), sorted(g.get_all_legal_moves()))
+        # Policies are looked up the same way as for the tree.
+        self.assertEqual(Rollout.amaf_rollout(g, random.Random(1), Rollout.greedy_rollout), (winner, played))
+        with self.assertRaises(ValueError):
+            Rollout.amaf_rollout(g, random.Random(1), "greedey")
+        with self.assertRaises(ValueError):
+            Rollout.get_policy("greedey")
+        for policy in ["greedy", "random"]:
+            player = PlayerFactory.PlayerFactory().makePlayer("Monte Carlo Player", 1, timeLimit=0.05, rolloutPolicy=policy)
+            self.assertIs(player.tree.policy, Rollout.POLICIES[policy])
+            self.assertTrue(g.is_legal_move(player.chooseMove(g.get_copy())))
+
+    def test_rave(self):
+        """
+        Test the AMAF rollout reports every move once, and that a RAVE search
+        fills in AMAF statistics for the root's moves.
+        """
+        g = Game.Game(4,4)
+        for move in [(0,0,0), (1,1,1), (0,2,1)]:
+            g.take_turn(move)
+        winner, played = Rollout.amaf_rollout(g, random.Random(2))
+        self.assertEqual(winner, Rollout.random_rollout(g, random.Random(2)))
+        self.assertFalse(played[1] & played[2])
+        self.assertEqual(sorted(played[1] | played[2]), sorted(g.get_all_legal_moves()))
+
+        player = PlayerFactory.PlayerFactory().makePlayer("Monte Carlo Player", 1, timeLimit=0.1, raveK=100)
+        self.assertEqual(player.tree.raveK, 100)
+        root = DotsAndBoxes.MonteCarloPlayer.MonteCarloNode(1, g.get_copy(), (0,0,0), "Root", raveK=100)
+        player.tree.root = root
+        player.tree.search()
+        # Each simulation adds at most one AMAF visit per move.
+        for move, (n, t) in root.amaf.items():
+            self.assertTrue(g.is_legal_move(move))
+            self.assertLessEqual(n, root.n)
+            self.assertLessEqual(t, n)
+        self.assertEqual(set(root.amaf), set(g.get_all_legal_moves()))
+        for child in root.children:
+            if child.n:
+                self.assertGreaterEqual(child.raveValue(), 0)
+
+    def test_transposition_dag(self):
+        """
+        Test that the DAG shares one node between move orders that reach the
+        same position, and that it can play a whole game.
+        """
+        dag = DotsAndBoxes.MonteCarloPlayer.MonteCarloDag(1, 0.05)
+        g = Game.Game(3,3)
+        dag.update(g.get_copy())
+        root = dag.root
+        a, b = (0,0,0), (1,2,1)
+        first = root.childNodes[root.expand(dag, a)]
+        second = root.childNodes[root.expand(dag, b)]
+        ab = first.childNodes[first.expand(dag, b)]
+        ba = second.childNodes[second.expand(dag, a)]
+        self.assertIs(ab, ba)
+        self.assertEqual(len(dag.nodes), 4)
+        expected = g.get_copy()
+        expected.take_turn(a)
+        expected.take_turn(b)
+        self.assertEqual(ba.game, expected)
+
+        player = DotsAndBoxes.MonteCarloPlayer.MonteCarloPlayer(1, timeLimit=0.05, storage="dag")
+        self.assertEqual(player.tree.parallelMode, "leaf")
+        # The DAG has no RAVE or root parallel search, so asking for them fails.
+        for options in [{"raveK": 100}, {"parallelMode": "root"}]:
+            with self.assertRaises(ValueError):
+                PlayerFactory.PlayerFactory().makePlayer("Monte Carlo Player", 1, storage="dag", **options)
+        other = PlayerFactory.PlayerFactory().makePlayer("Random Player", 2)
+        while not g.is_finished():
+            if g.currentPlayer == 1:
+                move = player.chooseMove(g.get_copy())
+                # Visits through the root's edges add up to the root's own.
+                root = player.tree.root
+                self.assertLessEqual(sum(root.edgeVisits), root.n)
+            else:
+                move = other.chooseMove(g.get_copy())
+            self.assertTrue(g.is_legal_move(move))
+            g.take_turn(move)
+
+    def test_parallel_modes(self):
+        """
+        Test root parallel and leaf parallel search both return legal moves,
+        and that results from all workers reach the root.
+        """
+        for mode in ["root", "leaf"]:
+            player = DotsAndBoxes.MonteCarloPlayer.MonteCarloPlayer(1, timeLimit=0.2, workers=2, parallelMode=mode)
+            g = Game.Game(3,3)
+            try:
+                move = player.chooseMove(g.get_copy())
+                self.assertTrue(g.is_legal_move(move))
+                # The new root is the child chosen from the old one.
+                self.assertEqual(player.tree.root.move, move)
+                g.take_turn(move)
+                g.take_turn(g.get_all_legal_moves()[0])
+                self.assertTrue(g.is_legal_move(player.chooseMove(g.get_copy())))
+            finally:
+                player.close()
+
+        node = DotsAndBoxes.MonteCarloPlayer.MonteCarloNode(1, Game.Game(3,3), (0,0,0), "Root")
+        child = node.chooseChild()
+        child.backpropagate(3, 8)
+        self.assertEqual((node.n, node.t), (8, 3))
+
+    def test_array_tree(self):
+        """
+        Test the array backed tree plays a whole game, keeping the subtree for
+        the moves made between turns.
+        """
+        g = Game.Game(3,3)
+        player = PlayerFactory.PlayerFactory().makePlayer("Monte Carlo Player", 1, timeLimit=0.05, storage="arrays")
+        # Options the array tree can't use are refused rather than ignored.
+        for options in [{"workers": 4}, {"parallelMode": "leaf"}, {"rolloutBatch": 8}, {"raveK": 100}]:
+            with self.assertRaises(ValueError):
+                PlayerFactory.PlayerFactory().makePlayer("Monte Carlo Player", 1, storage="arrays", **options)
+        other = PlayerFactory.PlayerFactory().makePlayer("Random Player", 2)
+        self.assertIsInstance(player.tree, DotsAndBoxes.MonteCarloArrayTree.ArrayMonteCarloTree)
+        while not g.is_finished():
+            if g.currentPlayer == 1:
+                move = player.chooseMove(g.get_copy())
+                # The root's statistics are those of the chosen child
+                self.assertGreater(player.tree.visits[0], 0)
+                self.assertEqual(player.tree.game.movesMade, g.movesMade + [move])
+            else:
+                move = other.chooseMove(g.get_copy())
+            self.assertTrue(g.is_legal_move(move))
+            g.take_turn(move)
+        # Every node below the root has a parent with more visits.
+        tree = player.tree
+        for node in range(1, len(tree)):
+            self.assertLessEqual(tree.visits[node], tree.visits[tree.parent[node]])
+
 class TestMinimaxMethods(unittest.TestCase):
     def test_minimax_selection(self):
         """
@@ -558,8 +1149,307 @@ class TestMinimaxMethods(unittest.TestCase):
         self.assertEqual(eval1, 15)
         self.assertEqual(eval2, -15)
 
+    def test_transposition_table(self):
+        """
+        Test that the transposition table gives the same scores as a search
+        without one, while searching fewer positions.
+        """
+        random.seed(3)
+        g = Game.Game(4,4)
+        for m in random.sample(g.get_all_legal_moves(), 8):
+            g.take_turn(m)
+        plain = DotsAndBoxes.MinimaxPlayer.MinimaxPlayer(g.currentPlayer, ttMemory=0)
+        withTable = DotsAndBoxes.MinimaxPlayer.MinimaxPlayer(g.currentPlayer, ttMemory=1)
+        for m in g.get_all_legal_moves():
+            g.take_turn(m)
+            score1 = plain.getScore(g, 3, -10000, 10000)
+            score2 = withTable.getScore(g, 3, -10000, 10000)
+            self.assertEqual(score1, score2)
+            g.undo_move()
+        self.assertLess(withTable.nodes, plain.nodes)
+
+    def test_transposition_table_replacement(self):
+        """
+        Test storing and probing entries, and depth-preferred replacement.
+        """
+        table = TranspositionTable.TranspositionTable(0.001)
+        self.assertIsNone(table.probe(12345))
+        table.store(12345, 4, 25, TranspositionTable.EXACT, (0,0,0))
+        self.assertEqual(table.probe(12345), (25, 4, TranspositionTable.EXACT, (0,0,0)))
+        # A shallower search for a position in the same slot doesn't replace it
+        other = 12345 + table.size
+        table.store(other, 2, 7, TranspositionTable.LOWER, (1,0,0))
+        self.assertIsNone(table.probe(other))
+        # But it does once the stored entry is from an older search
+        table.new_search()
+        table.store(other, 2, 7, TranspositionTable.LOWER, (1,0,0))
+        self.assertEqual(table.probe(other), (7, 2, TranspositionTable.LOWER, (1,0,0)))
+        self.assertIsNone(table.probe(12345))
+        # Clearing empties every slot.
+        table.clear()
+        self.assertIsNone(table.probe(other))
+        self.assertEqual(len(table.moves), table.size)
+
+    def test_move_ordering(self):
+        """
+        Test that moves are ordered captures first, then safe moves, then moves
+        that give away a box, with the hash move ahead of everything.
+        """
+        g = Game.Game(3,3)
+        # Top left box has 3 sides, top right box has 2.
+        for m in [(0,0,0), (1,0,0), (1,1,0), (0,0,1)]:
+            g.take_turn(m)
+        minimax = DotsAndBoxes.MinimaxPlayer.MinimaxPlayer(g.currentPlayer)
+        ordered = minimax.orderMoves(g, g.get_all_legal_moves())
+        self.assertEqual(sorted(ordered), sorted(g.get_all_legal_moves()))
+        # (0,1,0) completes the top left box
+        self.assertEqual(ordered[0], (0,1,0))
+        # (0,1,1) and (1,2,0) give the top right box a third side, so come last
+        self.assertEqual(sorted(ordered[-2:]), [(0,1,1), (1,2,0)])
+        ordered = minimax.orderMoves(g, g.get_all_legal_moves(), hashMove=(1,2,1))
+        self.assertEqual(ordered[0:2], [(1,2,1), (0,1,0)])
+
+    def test_endgame_solver(self):
+        """
+        Test that loony endgames are broken into the right chains and loops,
+        and are solved with the correct values.
+        """
+        # A Swedish 3x3 board is one loop of 4 boxes.
+        g = SwedishGame(3,3)
+        self.assertTrue(EndgameSolver.is_loony(g))
+        self.assertEqual(EndgameSolver.analyse(g), ([], [4]))
+        self.assertEqual(EndgameSolver.solve_game(g), -4)
+        # A 4x2 board with all of its vertical lines drawn is three 1-chains.
+        g = Game.Game(4,2)
+        for m in [(1,1,0), (1,2,0), (1,0,0), (1,3,0)]:
+            g.take_turn(m)
+        self.assertEqual(EndgameSolver.analyse(g), ([1, 1, 1], []))
+        self.assertEqual(EndgameSolver.solve_game(g), -1)
+        # Not loony while a box has fewer than 2 sides.
+        self.assertIsNone(EndgameSolver.solve_game(Game.Game(4,4)))
+        # Known values for simple sets of chains and loops
+        self.assertEqual(EndgameSolver.solve([3], []), -3)
+        self.assertEqual(EndgameSolver.solve([1, 1], []), 0)
+        self.assertEqual(EndgameSolver.solve([3, 3], []), -2)
+        self.assertEqual(EndgameSolver.solve([3], [4]), -1)
+
+    def test_endgame_matches_search(self):
+        """
+        Test that Minimax scores loony endgames the same with the solver as
+        with a full depth search.
+        """
+        # A Swedish 4x3 board with the middle line drawn is a loop of 6 boxes.
+        g = SwedishGame(4,3)
+        g.take_turn((0,1,1))
+        self.assertEqual(EndgameSolver.analyse(g), ([], [6]))
+        solver = DotsAndBoxes.MinimaxPlayer.MinimaxPlayer(g.currentPlayer)
+        search = DotsAndBoxes.MinimaxPlayer.MinimaxPlayer(g.currentPlayer, solveEndgames=False)
+        depth = len(g.get_all_legal_moves())
+        self.assertEqual(solver.getScore(g, depth, -10000, 10000), search.getScore(g, depth, -10000, 10000))
+        self.assertEqual(solver.nodes, 1)
+
+    def test_parallel_search(self):
+        """
+        Test that searching root moves in worker processes chooses the same
+        move as the serial search.
+        """
+        random.seed(5)
+        g = Game.Game(4,4)
+        for m in random.sample(g.get_all_legal_moves(), 10):
+            g.take_turn(m)
+        serial = DotsAndBoxes.MinimaxPlayer.MinimaxPlayer(g.currentPlayer, timeLimit=60, maxDepth=3)
+        with DotsAndBoxes.MinimaxPlayer.MinimaxPlayer(g.currentPlayer, timeLimit=60, maxDepth=3, workers=2) as parallel:
+            self.assertEqual(parallel.chooseMove(g.get_copy()), serial.chooseMove(g.get_copy()))
+            self.assertIsNotNone(parallel.pool)
+        # Leaving the with block shuts the workers down.
+        self.assertIsNone(parallel.pool)
+
+    def test_symmetry(self):
+        """
+        Test that reflected and rotated positions share a canonical key, that
+        moves can be taken to and from the canonical position, and that
+        Minimax searches fewer positions when it uses the keys.
+        """
+        for width, height, count in [(4,4,8), (5,3,4)]:
+            g = Game.Game(width, height)
+            self.assertEqual(len(Symmetry.get_symmetries(width, height)), count)
+            for move in [(0,0,0), (1,0,1), (0,1,1)]:
+                g.take_turn(move)
+            key, transform = Symmetry.canonical_key(g)
+            for t in range(count):
+                image = Game.Game(width, height)
+                for move in g.movesMade:
+                    image.take_turn(Symmetry.transform_move(g, move, t))
+                self.assertEqual(Symmetry.canonical_key(image)[0], key)
+                for move in g.get_all_legal_moves():
+                    self.assertEqual(Symmetry.untransform_move(g, Symmetry.transform_move(g, move, t), t), move)
+            # The canonical key is the hash of the position it belongs to.
+            image = Game.Game(width, height)
+            for move in g.movesMade:
+                image.take_turn(Symmetry.transform_move(g, move, transform))
+            self.assertEqual(image.hash, key)
+
+        plain = DotsAndBoxes.MinimaxPlayer.MinimaxPlayer(1, timeLimit=60, maxDepth=3)
+        symmetric = DotsAndBoxes.MinimaxPlayer.MinimaxPlayer(1, timeLimit=60, maxDepth=3, symmetryPlies=2)
+        g = Game.Game(4,4)
+        self.assertEqual(plain.chooseMove(g.get_copy()), symmetric.chooseMove(g.get_copy()))
+        self.assertLess(symmetric.nodes, plain.nodes)
+
     # def test_(self):
     #     """
     #     Test template
     #     """
     #     pass
+
+class TestTournamentMethods(unittest.TestCase):
+    def test_tournament(self):
+        """
+        Test a tournament plays every game in its worker processes, counts
+        each one once and saves them all to results files.
+        """
+        matchups = [("Random Player", "Ordered Player"), ("Ordered Player", ("Monte Carlo Player", {"timeLimit": 0.01}))]
+        with tempfile.TemporaryDirectory() as resultsDir:
+            seen = []
+            tournament = Tournament.Tournament(matchups, [(3,3), (4,3)], ["standard", "swedish"], games=3, workers=2, resultsDir=resultsDir, verbose=False)
+            results = tournament.run(lambda key, game: seen.append((key, game.is_finished())))
+            self.assertEqual(len(results), 8)
+            self.assertEqual(len(seen), 24)
+            self.assertTrue(all(finished for key, finished in seen))
+            for key, counts in results.items():
+                self.assertEqual(sum(counts), 3)
+                filename = tournament.resultsFilename(key)
+                moves = len(Game.Game(key[2], key[3]).get_all_legal_moves())
+                if key[4] == "swedish":
+                    moves = len(SwedishGame(key[2], key[3]).get_all_legal_moves())
+                with open(filename) as f:
+                    self.assertEqual(len(f.readlines()), 3*(moves+2))
+            self.assertIn(("Ordered", "Monte-timeLimit0.01", 3, 3, "swedish"), results)
+        with self.assertRaises(ValueError):
+            Tournament.Tournament(matchups, variants=["hexagonal"])
+
+    def test_binary_tournament(self):
+        """
+        Test a tournament can save binary game records, with each game's
+        players and seed, and resume from them.
+        """
+        matchups = [("Random Player", "Ordered Player")]
+        with tempfile.TemporaryDirectory() as resultsDir:
+            tournament = Tournament.Tournament(matchups, [(4,3)], ["random"], games=6, workers=2, resultsDir=resultsDir, verbose=False, recordFormat="binary")
+            results = tournament.run()
+            key = ("Random", "Ordered", 4, 3, "random")
+            filename = tournament.resultsFilename(key)
+            self.assertTrue(filename.endswith("1_Random_2_Ordered_4x3_random.dbr"))
+            records = list(ReadStatistics.read_records(filename))
+            self.assertEqual(sorted(record["seed"] for record in records), sorted(tournament.gameSeed(key, i) for i in range(6)))
+            for record in records:
+                self.assertEqual(record["players"], ("Random", "Ordered"))
+                self.assertEqual(record["variant"], "random")
+                self.assertTrue(record["blocked"])
+            self.assertEqual(ReadStatistics.count_record_winners(filename), results[key])
+            resumed = Tournament.Tournament(matchups, [(4,3)], ["random"], games=8, workers=2, resultsDir=resultsDir, verbose=False, recordFormat="binary")
+            self.assertEqual(sum(resumed.run()[key]), 8)
+            self.assertEqual(len(list(ReadStatistics.read_records(filename))), 8)
+        with self.assertRaises(ValueError):
+            Tournament.Tournament(matchups, recordFormat="csv")
+
+    def test_resume_tournament(self):
+        """
+        Test a tournament stopped part way resumes from its manifest, only
+        plays the missing games, and ends with the same results files as a
+        run that was never stopped.
+        """
+        matchups = [("Random Player", "Random Player"), ("Random Player", "Ordered Player")]
+        with tempfile.TemporaryDirectory() as fullDir, tempfile.TemporaryDirectory() as stoppedDir:
+            full = Tournament.Tournament(matchups, [(3,3), (4,4)], ["standard", "random"], games=4, workers=2, resultsDir=fullDir, verbose=False)
+            fullResults = full.run()
+            stopped = Tournament.Tournament(matchups, [(3,3), (4,4)], ["standard", "random"], games=4, workers=2, resultsDir=stoppedDir, verbose=False)
+            stopped.run()
+            # Stop part way: keep half the manifest, leave a game in a
+            # results file that never reached the manifest, and tear the
+            # last line.
+            with open(stopped.manifestFilename()) as f:
+                lines = f.readlines()
+            with open(stopped.manifestFilename(), "w") as f:
+                f.writelines(lines[:len(lines)//2])
+                f.write(lines[-1][:10])
+            played = []
+            resumed = Tournament.Tournament(matchups, [(3,3), (4,4)], ["standard", "random"], games=4, workers=2, resultsDir=stoppedDir, verbose=False)
+            self.assertEqual(resumed.run(lambda key, game: played.append(key)), fullResults)
+            self.assertEqual(len(played), len(lines) - len(lines)//2)
+            for key in fullResults:
+                with open(full.resultsFilename(key)) as a, open(resumed.resultsFilename(key)) as b:
+                    # Games are saved in the order they finish.
+                    self.assertEqual(sorted(re.split(r"(?m)^(?=\d+x\d+$)", a.read())), sorted(re.split(r"(?m)^(?=\d+x\d+$)", b.read())))
+            # A finished run has nothing left to play.
+            played = []
+            Tournament.Tournament(matchups, [(3,3), (4,4)], ["standard", "random"], games=4, workers=2, resultsDir=stoppedDir, verbose=False).run(lambda key, game: played.append(key))
+            self.assertEqual(played, [])
+
+    def test_stopping(self):
+        """
+        Test the stopping rules decide clear results quickly and not close
+        ones, and that a tournament stops a pairing early, says why in its
+        manifest, and doesn't play it again when resumed.
+        """
+        low, high = Stopping.wilson_interval(50, 100)
+        self.assertAlmostEqual(low, 0.4038, places=4)
+        self.assertAlmostEqual(high, 0.5962, places=4)
+        self.assertEqual(Stopping.wilson_interval(0, 0), (0.0, 1.0))
+        sprt = Stopping.SPRT(0.45, 0.55)
+        self.assertIsNone(sprt.check([9, 0, 0]))
+        self.assertIn("p >= 0.55", sprt.check([15, 0, 0]))
+        self.assertIn("p <= 0.45", sprt.check([0, 15, 0]))
+        self.assertIsNone(sprt.check([500, 500, 0]))
+        # Draws are half a win each way.
+        self.assertAlmostEqual(sprt.llr([3, 3, 10]), 0)
+        self.assertIsNone(Stopping.WilsonWidth(0.1).check([30, 0, 0]))
+        self.assertIsNotNone(Stopping.WilsonWidth(0.1).check([40, 0, 0]))
+        with self.assertRaises(ValueError):
+            Stopping.SPRT(0.6, 0.4)
+
+        class StopAfter:
+            def check(self, counts):
+                if sum(counts) >= 5:
+                    return "played {}".format(sum(counts))
+
+        matchups = [("Random Player", "Ordered Player")]
+        with tempfile.TemporaryDirectory() as resultsDir:
+            tournament = Tournament.Tournament(matchups, games=200, workers=2, resultsDir=resultsDir, verbose=False, stopping=StopAfter())
+            results = tournament.run()
+            key = ("Random", "Ordered", 3, 3, "standard")
+            # Games already running when it stopped are still counted.
+            self.assertTrue(5 <= sum(results[key]) < 20)
+            self.assertEqual(tournament.stopReasons[key], "played 5")
+            played = []
+            resumed = Tournament.Tournament(matchups, games=200, workers=2, resultsDir=resultsDir, verbose=True, stopping=StopAfter())
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                self.assertEqual(resumed.run(lambda key, game: played.append(key)), results)
+            self.assertEqual(played, [])
+            self.assertEqual(resumed.stopReasons, {key: "played 5"})
+            # The reason loaded from the manifest is still reported.
+            self.assertIn("Random vs Ordered on 3x3 standard after {} games: played 5".format(sum(results[key])), output.getvalue())
+
+    def test_sweep(self):
+        """
+        Test successive halving plays every value in the first round, only
+        the best half after it, and writes a summary with every value.
+        """
+        grid = {"c": [0.5, 1.4], "rolloutPolicy": ["random", "greedy"]}
+        with tempfile.TemporaryDirectory() as resultsDir:
+            sweep = Sweep.Sweep("Monte Carlo Player", grid, "Random Player", {"timeLimit": 0.005}, games=8, minGames=4, eta=2, workers=2, resultsDir=resultsDir, verbose=False)
+            self.assertEqual(len(sweep.configs), 4)
+            self.assertEqual(sweep.budgets(), [4, 8])
+            ranking = sweep.run()
+            self.assertEqual(len(ranking), 4)
+            self.assertEqual([sum(counts) for config, counts in ranking], [8, 8, 4, 4])
+            # The values kept were the best after the first round.
+            self.assertEqual(sorted(sweep.rounds.values()), [0, 0, 1, 1])
+            with open(os.path.join(resultsDir, "summary.txt")) as f:
+                lines = f.readlines()
+            self.assertEqual(len(lines), 6)
+            self.assertTrue(lines[1].startswith("c"))
+            # Running it again has nothing left to play.
+            again = Sweep.Sweep("Monte Carlo Player", grid, "Random Player", {"timeLimit": 0.005}, games=8, minGames=4, eta=2, workers=2, resultsDir=resultsDir, verbose=False)
+            self.assertEqual(again.run(), ranking)
+        self.assertEqual(Sweep.Sweep("Minimax Player", {"maxDepth": [1]}, games=100, minGames=10).budgets(), [10, 30, 90, 100])